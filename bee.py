@@ -6,6 +6,11 @@ import logging
 import re
 import sys
 
+import wordindex
+
+from topk import TopK, emit
+from wordindex import WordIndex, open_text
+
 VERSION = 0.1
 
 
@@ -22,26 +27,78 @@ def main(argv):
     parse_arguments(argv[1:])
     setup_logging()
 
-    word2count = read_unigrams(Global.args.unigrams, Global.args.letters, 0)
+    if Global.args.index is not None:
+        show(iter_index(WordIndex(Global.args.index), Global.args.letters, 0))
+    else:
+        with open_text(Global.args.unigrams) as f:
+            show(iter_unigrams(f, Global.args.letters, 0))
+# end main()
 
-    # Show pangrams from most common to least
-    print("Pangrams:")
-    letterset = set(Global.args.letters)
-    for word, count in sorted(word2count.items(), key=lambda item: item[1], reverse=True):
-        if set(word) == letterset:
-            del word2count[word]
-            print(word, count)
 
-    # Show everything else from longest word to shortest.
-    print("\nAll:")
-    for word, count in sorted(word2count.items(), key=lambda item: len(item[0]), reverse=True):
-        if count > Global.args.mincount:
-            print(word, count)
-# end main()
+def show(items):
+    """
+    Prints the pangrams in items, which are (word, count, whether it's a
+    pangram) triples, from most common to least, then the other words used
+    more than -mincount times from longest to shortest, each alphabetically
+    among equals. With -top, prints at most that many of each. With
+    -stream, prints each word as soon as it's read instead, in the order
+    read.
+    """
+    fmt = Global.args.format
+
+    if Global.args.stream:
+        for word, count, pangram in keep_words(items, Global.args.mincount):
+            emit(fmt, {'word': word, 'count': count, 'pangram': pangram},
+                 f"{word} {count}{' *' if pangram else ''}", flush=True)
+        return
+
+    # Ties are broken alphabetically, so that the order doesn't depend on
+    # whether the words came from -index or -unigrams.
+    pangrams = TopK(Global.args.top, key=lambda item: (item[1], alphabetical(item[0])))
+    others = TopK(Global.args.top, key=lambda item: (len(item[0]), alphabetical(item[0])))
+    for word, count, pangram in keep_words(items, Global.args.mincount):
+        if pangram:
+            pangrams.push((word, count))
+        else:
+            others.push((word, count))
 
+    # Show pangrams from most common to least
+    if fmt == 'text':
+        print("Pangrams:")
+    for word, count in pangrams.items():
+        emit(fmt, {'word': word, 'count': count, 'pangram': True}, f"{word} {count}")
 
-def read_unigrams(f, letters, mincount):
-    word2count = {}
+    # Show everything else from longest word to shortest.
+    if fmt == 'text':
+        print("\nAll:")
+    for word, count in others.items():
+        emit(fmt, {'word': word, 'count': count, 'pangram': False}, f"{word} {count}")
+# end show()
+
+
+def alphabetical(word):
+    """A key that is larger for words earlier in alphabetical order."""
+    return tuple(-ord(c) for c in word) + (0,)
+# end alphabetical()
+
+
+def keep_words(items, mincount):
+    """
+    Yields the (word, count, whether it's a pangram) triples in items for
+    the words that are pangrams or used more than mincount times.
+    """
+    for word, count, pangram in items:
+        if pangram or count > mincount:
+            yield word, count, pangram
+# end keep_words()
+
+
+def iter_unigrams(f, letters, mincount):
+    """
+    Yields (word, count, whether it's a pangram) for the words in f that
+    can be made from letters.
+    """
+    letterset = set(letters)
     wordre = re.compile(f'[{letters}]*{letters[0]}[{letters}]*$')
     for line in f:
         line = line.strip()
@@ -57,9 +114,44 @@ def read_unigrams(f, letters, mincount):
         # Skip if three identical letters in a row.
         if re.search(r'([a-z])\1\1', word):
             continue
-        word2count[word] = count
-    return word2count
-# end read_unigrams()
+        yield word, count, set(word) == letterset
+# end iter_unigrams()
+
+
+def iter_index(index, letters, mincount):
+    """
+    Same as iter_unigrams(), but reads a wordindex.WordIndex. Only looks at
+    the index buckets for the (at most 64) sets of letters that include the
+    center letter, so the time taken doesn't depend on the size of the
+    index. The pangrams are simply the bucket for the full set.
+    """
+    center = wordindex.letter_mask(letters[0])
+    others = wordindex.letter_mask(letters) & ~center
+    full = center | others
+
+    for mask in letter_subsets(others, center):
+        for ii in index.ids_with_mask(mask):
+            count = index.counts[ii]
+            if count < mincount:
+                continue
+            word = index.word(ii)
+
+            # Skip if three identical letters in a row.
+            if re.search(r'([a-z])\1\1', word):
+                continue
+            yield word, count, mask == full
+# end iter_index()
+
+
+def letter_subsets(others, center):
+    """Yields center combined with every subset of the letters in the mask others."""
+    subset = others
+    while True:
+        yield subset | center
+        if subset == 0:
+            break
+        subset = (subset - 1) & others
+# end letter_subsets()
 
 
 def parse_arguments(strs):
@@ -74,14 +166,26 @@ def parse_arguments(strs):
     parser.add_argument('letters',
                         help="Letters in bee")
     parser.add_argument('-unigrams',
-                        help="Unigram count file",
-                        type=argparse.FileType('r'),
+                        help="Unigram count file. May be gzipped",
                         default='RC_2017-09.1gram.counts.cumm.filtered')
 #                        default='RC_2017-09.1gram.counts.cumm.sorted')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -unigrams")
     parser.add_argument('-mincount',
                         help="Minimum number of times word must appear",
                         type=int,
                         default=200)
+    parser.add_argument('-top',
+                        help="Print at most this many pangrams and this many other words. 0 for all",
+                        type=int,
+                        default=0)
+    parser.add_argument('-stream',
+                        help="Print words as soon as they're read, unsorted",
+                        action='store_true')
+    parser.add_argument('-format',
+                        help="text, or jsonl for one JSON object per word",
+                        choices=['text', 'jsonl'],
+                        default='text')
     Global.args = parser.parse_args(strs)
 # end parse_arguments()
 
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+#
+# Builds a "count word" file such as RC_2017-09.1gram.counts.cumm.filtered,
+# for bee.py and wordament.py, from raw corpus shards:
+#
+# ./buildcounts.py -names names.gz -o counts.filtered RC_2017-09.*.txt.gz
+# ./buildcounts.py -input counts -names names.gz -keep alsowords -o counts.filtered part-*.counts.gz
+#
+# Each shard, plain or gzipped, is read by one worker of a process pool
+# (map). A worker counts the words that pass the game rules, writing its
+# counts to a run file sorted by word whenever it holds -maxwords words.
+# The runs are then merged by word, adding the counts, the names are taken
+# out, and what's left is sorted by count with a second external sort
+# (reduce). At no point is more than -maxwords words per process held in
+# memory, however big the corpus is.
+#
+# Words are lowercased. A word is kept only if it's all a-z after stripping
+# punctuation from its ends, and doesn't have three identical letters in a
+# row (the rule in wordament.read_unigrams()). So "Don't" and "aaah" are
+# dropped, and "Stone," counts as "stone". README.bee describes why names
+# are removed, and why some (-keep) are put back.
+
+import argparse
+import gzip
+import heapq
+import logging
+import multiprocessing
+import os
+import re
+import string
+import sys
+import tempfile
+import time
+
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from wordindex import open_text
+
+VERSION = 0.1
+
+WORDRE = re.compile(r'[a-z]+$')
+TRIPLERE = re.compile(r'([a-z])\1\1')
+
+# The most run files merged at once, to stay well inside the limit on open
+# files. More runs than this are merged in passes.
+MAXFANIN = 256
+
+
+class Global:
+    """Stores globals. There should be no instances of Global."""
+
+    # Command line arguments
+    args = None
+
+    # Directory for run files, shared with the workers.
+    tmpdir = None
+
+# end class Global
+
+
+def main(argv):
+    parse_arguments(argv[1:])
+    setup_logging()
+
+    names = read_words(Global.args.names) if Global.args.names is not None else set()
+    keep = read_words(Global.args.keep) if Global.args.keep is not None else set()
+    names -= keep
+    logging.info(f"Removing {len(names)} names")
+
+    start = time.time()
+    with tempfile.TemporaryDirectory(prefix='buildcounts-', dir=Global.args.tmpdir) as tmpdir:
+        Global.tmpdir = tmpdir
+
+        # Map: count each shard in a worker, spilling sorted runs.
+        runs = []
+        with multiprocessing.get_context('fork').Pool(Global.args.processes) as pool:
+            for path, shardruns in pool.imap_unordered(count_shard, Global.args.shards):
+                logging.info(f"Counted {path} into {len(shardruns)} runs")
+                runs.extend(shardruns)
+
+        # Reduce: add up each word's counts, filter and sort by count.
+        merged = ((word, count) for word, count in merge_runs(runs, tmpdir)
+                  if count >= Global.args.mincount and word not in names)
+        nwords = 0
+        with open_output(Global.args.o) as out:
+            for count, word in sort_by_count(merged, tmpdir, Global.args.maxwords):
+                out.write(f'{count} {word}\n')
+                nwords += 1
+    logging.info(f"Wrote {nwords} words to {Global.args.o} in {time.time() - start:.1f}s")
+# end main()
+
+
+def normalize(token: str) -> Optional[str]:
+    """Returns token as it should be counted, or None if it isn't a game word."""
+    word = token.strip(string.punctuation).lower()
+    if not WORDRE.match(word) or TRIPLERE.search(word):
+        return None
+    return word
+# end normalize()
+
+
+def read_tokens(f, kind: str) -> Iterator[Tuple[str, int]]:
+    """
+    Yields (token, count) from f. kind 'tokens' is raw text, where each
+    whitespace-separated token counts once. kind 'counts' is "count word"
+    lines.
+    """
+    if kind == 'tokens':
+        for line in f:
+            for token in line.split():
+                yield token, 1
+    else:
+        for line in f:
+            fields = line.split()
+            if len(fields) == 2:
+                yield fields[1], int(fields[0])
+# end read_tokens()
+
+
+def count_shard(path: str) -> Tuple[str, List[str]]:
+    """
+    Counts the words in one shard. Returns (path, the run files written),
+    each run sorted by word.
+    """
+    runs = []
+    word2count = {}
+    with open_text(path) as f:
+        for token, count in read_tokens(f, Global.args.input):
+            word = normalize(token)
+            if word is None:
+                continue
+            word2count[word] = word2count.get(word, 0) + count
+            if len(word2count) >= Global.args.maxwords:
+                runs.append(write_run(sorted(word2count.items()), Global.tmpdir))
+                word2count = {}
+    if word2count:
+        runs.append(write_run(sorted(word2count.items()), Global.tmpdir))
+    return path, runs
+# end count_shard()
+
+
+def write_run(items: Iterable[Tuple], tmpdir: str) -> str:
+    """Writes items, pairs, to a new run file in tmpdir. Returns its path."""
+    fd, path = tempfile.mkstemp(dir=tmpdir, suffix='.run')
+    with os.fdopen(fd, 'w') as f:
+        for a, b in items:
+            f.write(f'{a}\t{b}\n')
+    return path
+# end write_run()
+
+
+def read_run(path: str) -> Iterator[Tuple[str, str]]:
+    with open(path) as f:
+        for line in f:
+            a, b = line.rstrip('\n').split('\t')
+            yield a, b
+# end read_run()
+
+
+def merge_runs(runs: List[str], tmpdir: str) -> Iterator[Tuple[str, int]]:
+    """Yields (word, total count) in word order from runs sorted by word."""
+    while len(runs) > MAXFANIN:
+        runs = [write_run(merge_runs(runs[ii:ii + MAXFANIN], tmpdir), tmpdir)
+                for ii in range(0, len(runs), MAXFANIN)]
+    merged = heapq.merge(*(((word, int(count)) for word, count in read_run(run)) for run in runs))
+    word, total = None, 0
+    for nextword, count in merged:
+        if nextword != word:
+            if word is not None:
+                yield word, total
+            word, total = nextword, 0
+        total += count
+    if word is not None:
+        yield word, total
+# end merge_runs()
+
+
+def sort_by_count(items: Iterable[Tuple[str, int]], tmpdir: str, maxwords: int) -> Iterator[Tuple[int, str]]:
+    """
+    Yields (count, word) for items, (word, count) pairs, from the highest
+    count to the lowest, and by word for equal counts. Holds at most
+    maxwords items in memory, spilling sorted runs to tmpdir.
+    """
+    def bycount(item):
+        return -item[0], item[1]
+
+    runs = []
+    chunk = []
+    for word, count in items:
+        chunk.append((count, word))
+        if len(chunk) >= maxwords:
+            runs.append(write_run(sorted(chunk, key=bycount), tmpdir))
+            chunk = []
+    chunk.sort(key=bycount)
+    if not runs:
+        yield from chunk
+        return
+    runs.append(write_run(chunk, tmpdir))
+
+    def merge(runs):
+        return heapq.merge(*(((int(count), word) for count, word in read_run(run)) for run in runs), key=bycount)
+
+    while len(runs) > MAXFANIN:
+        runs = [write_run(merge(runs[ii:ii + MAXFANIN]), tmpdir) for ii in range(0, len(runs), MAXFANIN)]
+    yield from merge(runs)
+# end sort_by_count()
+
+
+def read_words(path: str) -> set:
+    """Reads a list of words, one per line, lowercased."""
+    with open_text(path) as f:
+        return {line.strip().lower() for line in f if line.strip()}
+# end read_words()
+
+
+def open_output(path: str):
+    """Opens path for writing text, compressing if it ends in .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'wt')
+    return open(path, 'w')
+# end open_output()
+
+
+def parse_arguments(strs):
+    parser = argparse.ArgumentParser(
+        description=f"Builds a filtered unigram counts file from corpus shards. Version {VERSION}.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-loglevel',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        default='INFO',
+                        help='Logging level')
+    parser.add_argument('-version', '--version', action='version', version=str(VERSION))
+    parser.add_argument('shards',
+                        help="Corpus shards. May be gzipped",
+                        nargs='+')
+    parser.add_argument('-input',
+                        help="tokens for raw text, counts for \"count word\" lines",
+                        choices=['tokens', 'counts'],
+                        default='tokens')
+    parser.add_argument('-names',
+                        help="Names to remove, one per line. May be gzipped")
+    parser.add_argument('-keep',
+                        help="Names that are also words, to keep anyway. May be gzipped")
+    parser.add_argument('-mincount',
+                        help="Leave out words seen fewer times than this",
+                        type=int,
+                        default=1)
+    parser.add_argument('-maxwords',
+                        help="Most distinct words a process holds in memory before spilling to disk",
+                        type=int,
+                        default=1000000)
+    parser.add_argument('-tmpdir',
+                        help="Directory for spilled runs. Defaults to the system temporary directory")
+    parser.add_argument('-processes',
+                        help="Worker processes",
+                        type=int,
+                        default=os.cpu_count())
+    parser.add_argument('-o',
+                        help="Counts file to write. Gzipped if it ends in .gz",
+                        required=True)
+    Global.args = parser.parse_args(strs)
+# end parse_arguments()
+
+
+def setup_logging():
+    numeric_level = getattr(logging, Global.args.loglevel, None)
+    if not isinstance(numeric_level, int):
+        raise ValueError(f'Invalid log level: {Global.args.loglevel}')
+    logging.basicConfig(level=numeric_level,
+                        format="%(module)s:%(levelname)s:%(asctime)s: %(message)s",
+                        datefmt='%Y-%m-%d %H:%M:%S')
+# end setup_logging()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,12 +1,32 @@
 #!/usr/bin/env python3
 #
+# Prints the words that match a set of Wordle constraints:
+#
+# ./candidates.py -green '.r...' -yellow a . . . . -gray eos
+#
+# or, with -batch, answers one JSON object per line such as
+#
+# {"id": 7, "green": ".r...", "yellow": ["a", ".", ".", ".", "."], "gray": "eos"}
+#
+# with a JSON line {"index": line number, "id": 7, "candidates": [...]} per
+# query, in the order given. "yellow", "gray" and "id" are optional. The word
+# list is loaded once and the queries are shared out to a pool of processes
+# forked after loading it.
 
 import argparse
 import collections
+import json
 import logging
-import re
+import multiprocessing
+import os
 import sys
 
+from typing import Tuple
+
+from constraints import Constraints
+from wordindex import WordIndex, open_text
+from wordmatrix import make_table
+
 VERSION = 0.1
 
 
@@ -16,6 +36,9 @@ class Global:
     # Command line arguments
     args = None
 
+    # Word tables by word length for -batch, shared with the workers.
+    tables = {}
+
 # end class Global
 
 
@@ -23,67 +46,84 @@ def main(argv):
     parse_arguments(argv[1:])
     setup_logging()
 
-    for word in Global.args.words:
-        word = word.strip()
-        if is_candidate(word, Global.args.green, Global.args.yellow, Global.args.gray):
+    if Global.args.batch is not None:
+        run_batch()
+        return
+
+    if Global.args.green is None or Global.args.yellow is None or Global.args.gray is None:
+        logging.error("-green, -yellow and -gray are required without -batch")
+        sys.exit(1)
+    try:
+        constraints = Constraints(Global.args.green, Global.args.yellow, Global.args.gray)
+    except ValueError as e:
+        logging.error(e)
+        sys.exit(1)
+
+    if Global.args.index is not None:
+        words = WordIndex(Global.args.index).words_of_length(constraints.length, lettersonly=True)
+    else:
+        words = (word.strip() for word in open_text(Global.args.words))
+
+    for word in words:
+        if constraints.matches(word):
             print(word)
 # end main()
 
 
-def is_candidate(word, green, yellow, gray):
+def run_batch():
     """
-    Arguments:
-
-    word - Input string
-    green - Regular expression that must be five characters. E.g. g...n
-    yellow - A list of give entries. Each entry is a character set that
-             must match. E.g. ['rn', '.', '.', 'g', '.'] means r and n
-             appear, but cannot be in the initial position, and g appears
-             but cannot be in the 4th position.
-    gray - A set containing letters that cannot appear. E.g. {'x', 'f', 'a'}
-           means x, f, and a cannot appear anywhere.
+    Answers each query in the -batch file, printing a JSON line for each in
+    the order they're given.
     """
-
-    # Regular expression matching anything in gray. That is, if gray
-    # contains "abc", then match the regexp [abc].
-
-    grayre = f"[{''.join(gray)}]"
-
-    # The set of all letters that occur anywhere in yellow.  All these
-    # letters must appear in the word somewhere.  For example, if
-    # -yellow . . ae . ab was passed, yellowset will contain
-    # {'a', 'b', 'e'}
-
-    yellowset = {c for c in ''.join(yellow) if c != '.'}
-
-    # This regular expression fails to matches if yellows appear in
-    # the wrong place. For example, if -yellow . . ae . ab was passed,
-    # yellowre will be '..[^ae].[^ab]'.
-
-    yellowre = ''.join([x if x == '.' else f'[^{x}]' for x in yellow])
-
-    # Not a candidate if any gray matches.
-    if re.search(grayre, word):
-        # print("gray failed")
-        return False
-
-    # Not a candidate if any green doesn't match.
-    if not re.match(Global.args.green, word):
-        # print("green failed")
-        return False
-
-    # Not a candidate if yellowset isn't a subset of the letters in word.
-    if not yellowset <= set(word):
-        # print(f"yellowset failed '{yellowset}'")
-        return False
-
-    # Not a candidate if yellows are in the wrong place.
-    if yellowre != '.....' and not re.match(yellowre, word):
-        # print("yellowre failed")
-        return False
-
-    return True
-# end is_candidate()
+    with open_text(Global.args.batch) as f:
+        queries = [parse_query(index, line) for index, line in enumerate(line for line in f if line.strip())]
+
+    lengths = {constraints.length for _, _, constraints in queries if constraints is not None}
+    if Global.args.index is not None:
+        index = WordIndex(Global.args.index)
+        for length in lengths:
+            Global.tables[length] = make_table(index.words_of_length(length, lettersonly=True))
+    else:
+        bylength = collections.defaultdict(list)
+        with open_text(Global.args.words) as f:
+            for word in f:
+                word = word.strip()
+                if len(word) in lengths:
+                    bylength[len(word)].append(word)
+        for length in lengths:
+            Global.tables[length] = make_table(bylength[length])
+
+    with multiprocessing.get_context('fork').Pool(Global.args.processes) as pool:
+        for result in pool.imap(answer_query, queries, chunksize=16):
+            print(json.dumps(result), flush=True)
+    logging.info(f"Answered {len(queries)} queries")
+# end run_batch()
+
+
+def parse_query(index: int, line: str) -> Tuple[dict, dict, Constraints]:
+    """
+    Returns (the fields to report, the query, its Constraints) for one
+    -batch line. If the line can't be read, the fields include 'error' and
+    the query and Constraints are None.
+    """
+    fields = {'index': index}
+    try:
+        query = json.loads(line)
+        if 'id' in query:
+            fields['id'] = query['id']
+        return fields, query, Constraints(query['green'], query.get('yellow'), query.get('gray', ''))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        fields['error'] = f"Can't read query: {e!r}"
+        return fields, None, None
+# end parse_query()
+
+
+def answer_query(item: Tuple[dict, dict, Constraints]) -> dict:
+    fields, _, constraints = item
+    if constraints is not None:
+        fields['candidates'] = Global.tables[constraints.length].filter(constraints)
+    return fields
+# end answer_query()
 
 
 def parse_arguments(strs):
@@ -96,16 +136,22 @@ def parse_arguments(strs):
                         help='Logging level')
     parser.add_argument('-version', '--version', action='version', version=str(VERSION))
     parser.add_argument('-words',
-                        type=argparse.FileType('r'),
+                        help="Word list. May be gzipped",
                         default='words')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -words")
     parser.add_argument('-yellow',
-                        nargs=5,
-                        required=True)
-    parser.add_argument('-green',
-                        required=True)
+                        help="One entry per position, as many as there are letters in -green",
+                        nargs='+')
+    parser.add_argument('-green')
     parser.add_argument('-gray',
-                        type=set,
-                        required=True)
+                        type=set)
+    parser.add_argument('-batch',
+                        help="File of JSON queries, one per line, instead of -green, -yellow and -gray. - for stdin")
+    parser.add_argument('-processes',
+                        help="Worker processes for -batch",
+                        type=int,
+                        default=os.cpu_count())
     Global.args = parser.parse_args(strs)
 # end parse_arguments()
 
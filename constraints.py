@@ -0,0 +1,233 @@
+#
+# Wordle constraints compiled to bitmasks.
+#
+# A word is packed into one integer with a 27-bit field per position. Bits
+# 0-25 of a field are the letters a-z and bit 26 marks the end of the word,
+# so "cat" has the c bit set in field 0, the a bit in field 1, the t bit in
+# field 2 and the end bit in field 3.
+#
+# Constraints are compiled into the same layout: each field holds the letters
+# still allowed at that position, and the field just past the last position
+# allows only the end bit. A separate 26-bit mask holds the letters that must
+# appear somewhere. A word is then a candidate exactly when
+#
+#     packed & allowed == packed and mask & required == required
+#
+# which is two integer ANDs per word. A word with anything other than a-z in
+# it, such as 'bout, packs to INVALID, which matches no constraints.
+
+import re
+
+from typing import Iterable, List, Optional
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+WORDRE = re.compile(r'[a-z]+$')
+
+# pack_word() of a word that isn't all a-z. Every bit is set, so it's never
+# inside the allowed fields.
+INVALID = -1
+
+# Mask with every letter set.
+ALL_LETTERS = (1 << 26) - 1
+
+# Width of one position in a packed word and the end-of-word bit.
+FIELD = 27
+END = 1 << 26
+
+
+def letter_bit(c: str) -> int:
+    """Returns the bit for letter c. Raises ValueError if c isn't in a-z."""
+    index = ord(c) - ord('a')
+    if not 0 <= index < 26:
+        raise ValueError(f'Not a lowercase letter: {c!r}')
+    return 1 << index
+# end letter_bit()
+
+
+def letter_mask(letters: Iterable[str]) -> int:
+    """Returns the mask of the distinct letters in letters. '.' is ignored."""
+    mask = 0
+    for c in letters:
+        if c != '.':
+            mask |= letter_bit(c)
+    return mask
+# end letter_mask()
+
+
+def is_word(word: str) -> bool:
+    """Returns True if word is one or more letters a-z."""
+    return WORDRE.match(word) is not None
+# end is_word()
+
+
+def pack_word(word: str) -> int:
+    """
+    Packs word into fields as described at the top of this file. Returns
+    INVALID if word isn't all a-z.
+    """
+    if not is_word(word):
+        return INVALID
+    packed = 0
+    for ii, c in enumerate(word):
+        packed |= letter_bit(c) << (FIELD * ii)
+    return packed | END << (FIELD * len(word))
+# end pack_word()
+
+
+def parse_green(green: str) -> List[int]:
+    """
+    Parses a green pattern such as 'g...n' into a list of allowed-letter
+    masks, one per position. A position is '.' for any letter, a letter, or
+    a character class such as [ab].
+    """
+    allowed = []
+    index = 0
+    while index < len(green):
+        c = green[index]
+        if c == '.':
+            allowed.append(ALL_LETTERS)
+        elif c == '[':
+            endindex = green.find(']', index)
+            if endindex < 0:
+                raise ValueError(f'Unterminated [ in {green!r}')
+            allowed.append(letter_mask(green[index+1:endindex]))
+            index = endindex
+        else:
+            allowed.append(letter_bit(c))
+        index += 1
+    return allowed
+# end parse_green()
+
+
+class Constraints:
+    """
+    Green, yellow, gray and required letters compiled once so that many
+    words can be checked cheaply.
+
+    green - A pattern with one entry per position, e.g. g...n. See
+            parse_green().
+    yellow - None, or a list with one entry per position. Each entry is an
+             iterable of letters that appear in the word but not at that
+             position; '.' is ignored. E.g. ['rn', '.', '.', 'g', '.'] or
+             [{'r', 'n'}, set(), set(), {'g'}, set()].
+    gray - Letters that cannot appear. Wordle reports a letter as gray if it
+           has already been reported as green or yellow elsewhere, so gray
+           letters that are also green, yellow or required are ignored.
+    required - Additional letters that must appear somewhere.
+    """
+
+    length: int
+
+    # Allowed letters for each position, as 26-bit masks.
+    allowed: List[int]
+
+    # Letters that must appear somewhere in the word.
+    required: int
+
+    # Letters that cannot appear anywhere in the word.
+    excluded: int
+
+    # allowed packed like pack_word(), including the end bit.
+    packed_allowed: int
+
+    def __init__(self, green: str = '.....', yellow: Optional[list] = None,
+                 gray: Iterable[str] = (), required: Iterable[str] = ()):
+        self.allowed = parse_green(green)
+        self.length = len(self.allowed)
+
+        self.required = letter_mask(required)
+        for mask in self.allowed:
+            if mask & (mask - 1) == 0:
+                self.required |= mask
+
+        if yellow is not None:
+            if len(yellow) != self.length:
+                raise ValueError(f'Expected {self.length} yellow entries, got {len(yellow)}')
+            for ii, letters in enumerate(yellow):
+                mask = letter_mask(letters)
+                self.allowed[ii] &= ~mask
+                self.required |= mask
+
+        self.excluded = letter_mask(gray) & ~self.required
+        self.allowed = [mask & ~self.excluded for mask in self.allowed]
+
+        self.packed_allowed = END << (FIELD * self.length)
+        for ii, mask in enumerate(self.allowed):
+            self.packed_allowed |= mask << (FIELD * ii)
+    # end __init__()
+
+    def matches(self, word: str) -> bool:
+        """Returns True if word is consistent with the constraints."""
+        packed = pack_word(word)
+        required = self.required
+        return packed & self.packed_allowed == packed and letter_mask(word) & required == required
+    # end matches()
+
+    def key(self) -> str:
+        """
+        Returns a canonical string for the constraints. It's built from the
+        compiled masks, so it doesn't depend on how they were spelled: gray
+        letters in any order, a yellow letter given at several positions or
+        a gray letter that's also green all give the same key as the
+        simplest spelling.
+        """
+        return ','.join(f'{mask:x}' for mask in self.allowed) + f'/{self.required:x}'
+    # end key()
+
+# end class Constraints
+
+
+class WordTable:
+    """
+    Packed words and letter masks for a fixed list of words, computed once
+    so that each set of constraints costs two ANDs per word.
+    """
+
+    words: List[str]
+    packed: List[int]
+    masks: List[int]
+
+    def __init__(self, words: Iterable[str]):
+        # Words that aren't all a-z can't be candidates, so they're left out.
+        self.words = [word for word in words if is_word(word)]
+        self.packed = [pack_word(word) for word in self.words]
+        self.masks = [letter_mask(word) for word in self.words]
+    # end __init__()
+
+    def __len__(self):
+        return len(self.words)
+
+    def select(self, constraints: Constraints, indices: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Returns the indices of the words that match constraints, in order.
+        If indices is given, only those words are checked.
+        """
+        if indices is None:
+            indices = range(len(self.words))
+        packed = self.packed
+        masks = self.masks
+        allowed = constraints.packed_allowed
+        required = constraints.required
+        return [ii for ii in indices
+                if packed[ii] & allowed == packed[ii] and masks[ii] & required == required]
+    # end select()
+
+    def filter(self, constraints: Constraints, indices: Optional[Iterable[int]] = None) -> List[str]:
+        """Like select(), but returns the words rather than their indices."""
+        return [self.words[ii] for ii in self.select(constraints, indices)]
+    # end filter()
+
+    def select_many(self, constraints_list: List[Constraints],
+                    indices_list: Optional[List[Iterable[int]]] = None) -> List[List[int]]:
+        """
+        Same as select() for each constraint set in constraints_list, with
+        indices_list[i], if given, the words to check for the i'th. Returns
+        one list of indices per constraint set.
+        """
+        if indices_list is None:
+            indices_list = [None] * len(constraints_list)
+        return [self.select(constraints, indices) for constraints, indices in zip(constraints_list, indices_list)]
+    # end select_many()
+
+# end class WordTable
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+#
+# Precomputed Wordle decision trees.
+#
+# ./decisiontree.py -words words.gz -unigrams unigram_counts.gz -strategy entropy -o entropy.tree.gz
+#
+# plays solve2.Solver against every possible reply, from the first guess
+# down to a single candidate, and saves the guess it makes in each state.
+# solve2.py -tree and server.py -tree then look up the next guess instead
+# of searching for it. A game that leaves the tree, for example because the
+# player made a guess of their own, goes back to live search.
+#
+# The pattern strategies pick the next guess from the candidates alone, so
+# the guess for each distinct set of candidates is remembered and reused.
+# The branches under the first guess are built in parallel by a pool of
+# forked workers that share the pattern table.
+#
+# The tree is saved as gzipped JSON. A node is [guess] once only one
+# candidate is left, and [guess, {pattern: node, ...}] before that, where
+# guess is an index into the sorted word list and pattern a reply as
+# encoded by patterns.py. The file records a hash of the word list, so a
+# tree isn't used with a different one.
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from typing import List, Optional
+
+import patterns
+import solve2
+import strategy
+
+from patterns import all_green, pattern_reply, reply_pattern
+from wordindex import WordBuckets
+from wordmatrix import make_table
+
+VERSION = 0.1
+
+FORMAT_VERSION = 1
+
+# No sensible tree is this deep. A branch is cut off here, leaving games
+# that get this far to live search, in case a guess doesn't split the
+# candidates.
+MAXDEPTH = 20
+
+
+class Global:
+    """Stores globals. There should be no instances of Global."""
+
+    # Command line arguments
+    args = None
+
+    # Set up in main() before the workers are forked: the solver in its
+    # starting state, the first guess, the index of each word, and the next
+    # guess for each set of candidates seen so far.
+    solver = None
+    first = None
+    wordids = None
+    memo = {}
+
+# end class Global
+
+
+def main(argv):
+    parse_arguments(argv[1:])
+    setup_logging()
+
+    buckets = WordBuckets(Global.args.words, Global.args.unigrams, Global.args.index)
+    unigrams = buckets.counts(Global.args.length)
+    table = make_table(buckets.words(Global.args.length))
+    patterntable = patterns.load_table(table.words, Global.args.cachedir)
+
+    Global.solver = solve2.Solver(table, unigrams, Global.args.strategy, patterntable, None,
+                                  Global.args.hardmode)
+    Global.wordids = {word: ii for ii, word in enumerate(table.words)}
+    Global.first = Global.args.first
+    if Global.first is None:
+        Global.first = 'aeros' if Global.args.length == 5 else ''
+    Global.first = Global.first or Global.solver.next_guess()
+    if Global.first not in Global.wordids:
+        logging.error(f"{Global.first} isn't in the word list")
+        sys.exit(1)
+    logging.info(f"Building the {Global.args.strategy} tree for {len(table)} words from {Global.first}")
+
+    start = time.time()
+    children = {}
+    with multiprocessing.get_context('fork').Pool(Global.args.processes) as pool:
+        for pattern, child in pool.imap_unordered(build_branch, first_replies()):
+            children[pattern] = child
+            logging.info(f"Built {Global.first} {pattern_reply(pattern, len(Global.first))} ({len(children)} done)")
+    root = [Global.wordids[Global.first], {p: children[p] for p in sorted(children)}]
+
+    save_tree(Global.args.o, root, table.words, Global.args.strategy, Global.args.hardmode)
+    logging.info(f"Wrote {count_nodes(root)} nodes to {Global.args.o} in {time.time() - start:.1f}s")
+# end main()
+
+
+def first_replies() -> List[int]:
+    """Returns the patterns the first guess can get."""
+    solver = Global.solver
+    row = solver.patterntable[Global.wordids[Global.first]]
+    return sorted({int(row[ai]) for ai in solver.survivors} - {all_green(solver.length)})
+# end first_replies()
+
+
+def build_branch(pattern: int):
+    """Returns (pattern, the node reached by getting pattern for the first guess)."""
+    solver = Global.solver
+    solver.update(Global.first, pattern_reply(pattern, solver.length))
+    node = build_node(solver, 1)
+    solver.undo()
+    return pattern, node
+# end build_branch()
+
+
+def build_node(solver: 'solve2.Solver', depth: int) -> list:
+    """Returns the node for solver's current state, which has at least one candidate."""
+    if len(solver.survivors) == 1:
+        return [solver.survivors[0]]
+    key = tuple(solver.survivors)
+    guess = Global.memo.get(key)
+    if guess is None:
+        guess = solver.next_guess()
+        Global.memo[key] = guess
+
+    gi = Global.wordids[guess]
+    if depth >= MAXDEPTH:
+        logging.warning(f"Cutting off the tree at {guess} after {depth} guesses")
+        return [gi, {}]
+    row = solver.patterntable[gi]
+    children = {}
+    for pattern in sorted({int(row[ai]) for ai in solver.survivors} - {all_green(solver.length)}):
+        solver.update(guess, pattern_reply(pattern, solver.length))
+        children[pattern] = build_node(solver, depth + 1)
+        solver.undo()
+    return [gi, children]
+# end build_node()
+
+
+def count_nodes(node: list) -> int:
+    return 1 + sum(count_nodes(child) for child in node[1].values()) if len(node) > 1 else 1
+# end count_nodes()
+
+
+def words_digest(words: List[str]) -> str:
+    return hashlib.sha1('\n'.join(words).encode('utf-8')).hexdigest()
+# end words_digest()
+
+
+def save_tree(path: str, root: list, words: List[str], strategyname: str, hardmode: bool):
+    """Writes the tree in the format described at the top of this file."""
+    data = {'version': FORMAT_VERSION, 'words': words_digest(words), 'nwords': len(words),
+            'strategy': strategyname, 'hardmode': hardmode, 'root': root}
+    with gzip.open(path, 'wt') as f:
+        json.dump(data, f, separators=(',', ':'))
+# end save_tree()
+
+
+class DecisionTree:
+    """
+    A tree written by decisiontree.py, for the sorted word list words. A
+    node can be kept between guesses, so each guess costs one lookup.
+    """
+
+    def __init__(self, path: str, words: List[str]):
+        with gzip.open(path, 'rt') as f:
+            data = json.load(f)
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f'{path} has format version {data.get("version")}, expected {FORMAT_VERSION}')
+        if data['words'] != words_digest(words):
+            raise ValueError(f'{path} was built for a different word list')
+        self.words = words
+        self.strategy = data['strategy']
+        self.hardmode = data['hardmode']
+        self.root = data['root']
+    # end __init__()
+
+    def guess(self, node: list) -> str:
+        """Returns the guess to make at node."""
+        return self.words[node[0]]
+    # end guess()
+
+    def child(self, node: Optional[list], guess: str, reply: str) -> Optional[list]:
+        """
+        Returns the node reached from node by guessing guess and getting
+        reply, or None if that's not in the tree (including when node is
+        None).
+        """
+        if node is None or len(node) < 2 or self.words[node[0]] != guess:
+            return None
+        return node[1].get(str(reply_pattern(reply)))
+    # end child()
+
+    def find(self, history) -> Optional[list]:
+        """Returns the node reached by history, a list of (guess, reply), or None."""
+        node = self.root
+        for guess, reply in history:
+            node = self.child(node, guess, reply)
+        return node
+    # end find()
+
+# end class DecisionTree
+
+
+def parse_arguments(strs):
+    parser = argparse.ArgumentParser(
+        description=f"Builds a Wordle decision tree. Version {VERSION}.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-loglevel',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        default='INFO',
+                        help='Logging level')
+    parser.add_argument('-version', '--version', action='version', version=str(VERSION))
+    parser.add_argument('-words',
+                        help="Word list. May be gzipped",
+                        default='words')
+    parser.add_argument('-unigrams',
+                        help="Unigram count file. May be gzipped",
+                        default='unigram_counts')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -words and -unigrams")
+    parser.add_argument('-length',
+                        help="Word length",
+                        type=int,
+                        default=5)
+    parser.add_argument('-strategy',
+                        help="How the tree chooses each guess",
+                        choices=strategy.STRATEGIES,
+                        default='entropy')
+    parser.add_argument('-hardmode',
+                        help="Only guess words that are still candidates",
+                        action='store_true')
+    parser.add_argument('-first',
+                        help="First guess. Defaults to aeros for 5 letters. If empty, -strategy computes it")
+    parser.add_argument('-processes',
+                        help="Worker processes",
+                        type=int,
+                        default=os.cpu_count())
+    parser.add_argument('-cachedir',
+                        help="Directory for cached pattern tables",
+                        default=patterns.DEFAULT_CACHEDIR)
+    parser.add_argument('-o',
+                        help="Tree file to write",
+                        required=True)
+    Global.args = parser.parse_args(strs)
+# end parse_arguments()
+
+
+def setup_logging():
+    numeric_level = getattr(logging, Global.args.loglevel, None)
+    if not isinstance(numeric_level, int):
+        raise ValueError(f'Invalid log level: {Global.args.loglevel}')
+    logging.basicConfig(level=numeric_level,
+                        format="%(module)s:%(levelname)s:%(asctime)s: %(message)s",
+                        datefmt='%Y-%m-%d %H:%M:%S')
+# end setup_logging()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
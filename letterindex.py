@@ -0,0 +1,124 @@
+#
+# An inverted letter -> word index for letter-coverage searches.
+#
+# For each letter there is a bitset, stored as one big int, of the words
+# that contain it; bit i stands for words[i]. To count how many of a set of
+# letters each word contains, the letters' bitsets are added together with a
+# bit-sliced counter: plane j holds bit j of every word's count, so adding a
+# letter costs a few big-int ANDs and XORs no matter how many words there
+# are. Ties go to the earliest word, which is the lowest set bit.
+#
+# The index is built once per word list, in one pass over the words, and a
+# search can be limited to a subset of them, such as the words that are
+# still candidates, by passing the subset's bitset as within.
+
+from typing import Iterable, List, Optional, Tuple
+
+
+class LetterIndex:
+    """Bitsets of the words containing each letter a-z."""
+
+    words: List[str]
+
+    # bitsets[c] has bit i set if words[i] contains chr(ord('a') + c).
+    bitsets: List[int]
+
+    def __init__(self, words: Iterable[str]):
+        self.words = list(words)
+        digits = {c: bytearray(b'0' * len(self.words)) for c in 'abcdefghijklmnopqrstuvwxyz'}
+        for ii, word in enumerate(self.words):
+            for c in word:
+                digits[c][ii] = ord('1')
+        self.bitsets = [self._int(d) for d in digits.values()]
+        self.all = (1 << len(self.words)) - 1
+    # end __init__()
+
+    @staticmethod
+    def _int(digits: bytearray) -> int:
+        """Returns the bitset with bit i set if digits[i] is '1'."""
+        # Written as a binary number, the first word is the last digit.
+        return int(digits[::-1] or b'0', 2)
+    # end _int()
+
+    def bitset(self, indices: Iterable[int]) -> int:
+        """Returns the bitset of words[i] for each i in indices."""
+        digits = bytearray(b'0' * len(self.words))
+        for ii in indices:
+            digits[ii] = ord('1')
+        return self._int(digits)
+    # end bitset()
+
+    def _add(self, planes: List[int], c: str):
+        """Adds one to the count in planes of every word containing c."""
+        carry = self.bitsets[ord(c) - ord('a')]
+        for jj in range(len(planes)):
+            if not carry:
+                break
+            planes[jj], carry = planes[jj] ^ carry, planes[jj] & carry
+        if carry:
+            planes.append(carry)
+    # end _add()
+
+    def _equal(self, planes: List[int], count: int, within: int) -> int:
+        """
+        Returns the bitset of the words in within whose count in planes is
+        count.
+        """
+        if count >> len(planes):
+            return 0
+        result = within
+        for jj, plane in enumerate(planes):
+            result &= plane if count >> jj & 1 else ~plane
+        return result
+    # end _equal()
+
+    def _word(self, bitset: int) -> str:
+        """Returns the word for the lowest bit set in bitset."""
+        return self.words[(bitset & -bitset).bit_length() - 1]
+    # end _word()
+
+    def best_cover(self, letters: str, within: Optional[int] = None) -> Tuple[Optional[str], int]:
+        """
+        Returns (word, count) for the first word, of those in within if
+        given, containing the most distinct letters in letters, or
+        (None, -1) if there are no words.
+        """
+        if within is None:
+            within = self.all
+        if not within:
+            return None, -1
+        planes = []
+        for c in set(letters):
+            self._add(planes, c)
+        for count in range(min(len(set(letters)), 26), 0, -1):
+            matches = self._equal(planes, count, within)
+            if matches:
+                return self._word(matches), count
+        return self._word(within), 0
+    # end best_cover()
+
+    def first_full_cover(self, letters: str, full: int, start: int, stop: int,
+                         within: Optional[int] = None) -> Tuple[Optional[str], int]:
+        """
+        Finds the shortest prefix letters[:n], for start <= n < stop, for
+        which some word, of those in within if given, contains full of its
+        letters. Returns (the first such word, n), or (None, 0) if there
+        isn't one. This takes one pass over letters, however many prefixes
+        are tried.
+        """
+        if within is None:
+            within = self.all
+        planes = []
+        seen = set()
+        for n, c in enumerate(letters[:max(stop - 1, 0)], start=1):
+            if c not in seen:
+                seen.add(c)
+                self._add(planes, c)
+            if n >= start:
+                matches = self._equal(planes, full, within)
+                if matches:
+                    return self._word(matches), n
+        return None, 0
+    # end first_full_cover()
+
+# end class LetterIndex
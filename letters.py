@@ -1,12 +1,31 @@
 #!/usr/bin/env python3
 #
+# Prints the letters we have no info about yet, most common in the
+# candidates first, for the word list on stdin:
+#
+# ./letters.py -green '.r...' -yellow a . . . . -gray eos < words
+#
+# With -batch, reads the word list from stdin once and answers one JSON
+# query per line of the -batch file, in the format candidates.py -batch
+# takes, with a JSON line {"index": line number, "id": ..., "ncandidates":
+# n, "letters": "..."} per query, in the order given. The queries are shared
+# out to a pool of processes forked after the words are read.
 
 import argparse
 import collections
+import json
 import logging
-import re
+import multiprocessing
+import os
 import sys
 
+from typing import Iterable, List, Optional, Tuple
+
+from candidates import parse_query
+from constraints import Constraints
+from wordindex import open_text
+from wordmatrix import make_table
+
 VERSION = 0.1
 
 
@@ -16,6 +35,9 @@ class Global:
     # Command line arguments
     args = None
 
+    # Word tables by word length for -batch, shared with the workers.
+    tables = {}
+
 # end class Global
 
 
@@ -23,13 +45,24 @@ def main(argv):
     parse_arguments(argv[1:])
     setup_logging()
 
-    lettercounts = collections.Counter()
+    if Global.args.batch is not None:
+        run_batch()
+        return
+
+    if Global.args.green is None or Global.args.yellow is None or Global.args.gray is None:
+        logging.error("-green, -yellow and -gray are required without -batch")
+        sys.exit(1)
+    try:
+        constraints = Constraints(Global.args.green, Global.args.yellow, Global.args.gray)
+    except ValueError as e:
+        logging.error(e)
+        sys.exit(1)
+
     candidates = set()
 
     for word in sys.stdin:
         word = word.strip()
-        if is_candidate(word, Global.args.green, Global.args.yellow, Global.args.gray):
-            lettercounts.update(word)
+        if constraints.matches(word):
             candidates.add(word)
 
     if len(candidates) == 1:
@@ -40,75 +73,69 @@ def main(argv):
         logging.error("No candidates found!")
         sys.exit(0)
 
-    # Remove any we have info about.
-    for letter in (set(Global.args.green) |
-                   Global.args.gray |
-                   set(''.join(Global.args.yellow)) - set('.')):
-        del lettercounts[letter]
+    letters = informative_letters(candidates, Global.args.green, Global.args.yellow, Global.args.gray)
 
-    if len(lettercounts) == 0:
+    if len(letters) == 0:
         sys.stderr.write("No additional letters. The following are possible:\n ")
         sys.stderr.write(' '.join(list(candidates)))
         sys.stderr.write('\n')
 
-    print(''.join([x[0] for x in lettercounts.most_common()]))
+    print(letters)
 # end main()
 
 
-def is_candidate(word, green, yellow, gray):
+def informative_letters(candidates: Iterable[str], green: str, yellow: Optional[List[str]],
+                        gray: Iterable[str]) -> str:
     """
-    Arguments:
-
-    word - Input string
-    green - Regular expression that must be five characters. E.g. g...n
-    yellow - A list of give entries. Each entry is a character set that
-             must match. E.g. ['rn', '.', '.', 'g', '.'] means r and n
-             appear, but cannot be in the initial position, and g appears
-             but cannot be in the 4th position.
-    gray - A set containing letters that cannot appear. E.g. {'x', 'f', 'a'}
-           means x, f, and a cannot appear anywhere.
+    Returns the letters in candidates that aren't in green, yellow or gray,
+    most common first.
     """
+    lettercounts = collections.Counter(''.join(candidates))
 
-    # Regular expression matching anything in gray. That is, if gray
-    # contains "abc", then match the regexp [abc].
-
-    grayre = f"[{''.join(gray)}]"
-
-    # The set of all letters that occur anywhere in yellow.  All these
-    # letters must appear in the word somewhere.  For example, if
-    # -yellow . . ae . ab was passed, yellowset will contain
-    # {'a', 'b', 'e'}
-
-    yellowset = {c for c in ''.join(yellow) if c != '.'}
+    # Remove any we have info about.
+    for letter in (set(green) |
+                   set(gray) |
+                   set(''.join(yellow or [])) - set('.')):
+        del lettercounts[letter]
 
-    # This regular expression fails to matches if yellows appear in
-    # the wrong place. For example, if -yellow . . ae . ab was passed,
-    # yellowre will be '..[^ae].[^ab]'.
+    return ''.join([x[0] for x in lettercounts.most_common()])
+# end informative_letters()
 
-    yellowre = ''.join([x if x == '.' else f'[^{x}]' for x in yellow])
 
-    # Not a candidate if any gray matches.
-    if re.search(grayre, word):
-        # print("gray failed")
-        return False
+def run_batch():
+    """
+    Answers each query in the -batch file against the words on stdin,
+    printing a JSON line for each in the order they're given.
+    """
+    if Global.args.batch == '-':
+        logging.error("The words are read from stdin, so -batch must be a file")
+        sys.exit(1)
+    with open_text(Global.args.batch) as f:
+        queries = [parse_query(index, line) for index, line in enumerate(line for line in f if line.strip())]
 
-    # Not a candidate if any green doesn't match.
-    if not re.match(Global.args.green, word):
-        # print("green failed")
-        return False
+    bylength = collections.defaultdict(list)
+    for word in sys.stdin:
+        word = word.strip()
+        bylength[len(word)].append(word)
+    for length in {constraints.length for _, _, constraints in queries if constraints is not None}:
+        Global.tables[length] = make_table(bylength[length])
 
-    # Not a candidate if yellowset isn't a subset of the letters in word.
-    if not yellowset <= set(word):
-        # print(f"yellowset failed '{yellowset}'")
-        return False
+    with multiprocessing.get_context('fork').Pool(Global.args.processes) as pool:
+        for result in pool.imap(answer_query, queries, chunksize=16):
+            print(json.dumps(result), flush=True)
+    logging.info(f"Answered {len(queries)} queries")
+# end run_batch()
 
-    # Not a candidate if yellows are in the wrong place.
-    if yellowre != '.....' and not re.match(yellowre, word):
-        # print("yellowre failed")
-        return False
 
-    return True
-# end is_candidate()
+def answer_query(item: Tuple[dict, dict, Constraints]) -> dict:
+    fields, query, constraints = item
+    if constraints is not None:
+        candidates = Global.tables[constraints.length].filter(constraints)
+        fields['ncandidates'] = len(candidates)
+        fields['letters'] = informative_letters(candidates, query['green'], query.get('yellow'),
+                                                query.get('gray', ''))
+    return fields
+# end answer_query()
 
 
 def parse_arguments(strs):
@@ -121,13 +148,17 @@ def parse_arguments(strs):
                         help='Logging level')
     parser.add_argument('-version', '--version', action='version', version=str(VERSION))
     parser.add_argument('-yellow',
-                        nargs=5,
-                        required=True)
-    parser.add_argument('-green',
-                        required=True)
+                        help="One entry per position, as many as there are letters in -green",
+                        nargs='+')
+    parser.add_argument('-green')
     parser.add_argument('-gray',
-                        type=set,
-                        required=True)
+                        type=set)
+    parser.add_argument('-batch',
+                        help="File of JSON queries, one per line, instead of -green, -yellow and -gray")
+    parser.add_argument('-processes',
+                        help="Worker processes for -batch",
+                        type=int,
+                        default=os.cpu_count())
     Global.args = parser.parse_args(strs)
 # end parse_arguments()
 
@@ -0,0 +1,81 @@
+#
+# A size-bounded least-recently-used cache of JSON-able values.
+#
+# Entries are kept in memory and, if a path is given, in an sqlite database
+# too, so that they survive between runs and are shared by every process
+# that uses the same file. Each bound is maxsize entries; the entries used
+# longest ago are dropped first. The database records when each entry was
+# last used, so a value that's popular in one process stays cached for the
+# others.
+
+import collections
+import json
+import os
+import sqlite3
+import time
+
+from typing import Any, Optional
+
+
+class LRUCache:
+    """Maps string keys to JSON-able values, keeping the maxsize most recently used."""
+
+    def __init__(self, maxsize: int, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self.memory = collections.OrderedDict()
+        self.db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.db = sqlite3.connect(path, timeout=30)
+            self.db.execute('CREATE TABLE IF NOT EXISTS cache '
+                            '(key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS cache_used ON cache (used)')
+            self.db.commit()
+    # end __init__()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the value for key, or None if it isn't cached."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return self.memory[key]
+        if self.db is None:
+            return None
+
+        row = self.db.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        with self.db:
+            self.db.execute('UPDATE cache SET used = ? WHERE key = ?', (time.time(), key))
+        value = json.loads(row[0])
+        self._remember(key, value)
+        return value
+    # end get()
+
+    def put(self, key: str, value: Any):
+        """Caches value for key, dropping the least recently used entries beyond maxsize."""
+        self._remember(key, value)
+        if self.db is None:
+            return
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO cache (key, value, used) VALUES (?, ?, ?)',
+                            (key, json.dumps(value, separators=(',', ':')), time.time()))
+            self.db.execute('DELETE FROM cache WHERE key IN '
+                            '(SELECT key FROM cache ORDER BY used DESC LIMIT -1 OFFSET ?)', (self.maxsize,))
+    # end put()
+
+    def _remember(self, key: str, value: Any):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+    # end _remember()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+    # end close()
+
+# end class LRUCache
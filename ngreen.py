@@ -1,11 +1,40 @@
 #!/usr/bin/env python3
 #
+# Counts how many greens a guess would get against a list of candidates:
+#
+# ./ngreen.py arise < candidates
+#
+# or, with -all, ranks every guess by the greens and yellows it would get on
+# average:
+#
+# ./ngreen.py -all -words words -unigrams unigram_counts -top 20 < candidates
+#
+# -all counts the candidates once, into a -length x 26 matrix of how often
+# each letter is at each position and a 26 vector of how often each letter
+# is anywhere, weighted by -unigrams if given. A guess's expected greens are
+# then the sum of one matrix entry per position, and its expected yellows
+# the sum of the vector entries for its distinct letters less its greens,
+# which is exact for guesses without repeated letters. Every guess is scored
+# at once, so ranking the whole word list takes one pass over the
+# candidates instead of one per guess.
 
 import argparse
 import logging
 import sys
 
-VERSION = 0.1
+from typing import List, Tuple
+
+from topk import TopK, emit
+from wordindex import open_text
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+VERSION = 0.2
+
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
 
 
 class Global:
@@ -21,25 +50,165 @@ def main(argv):
     parse_arguments(argv[1:])
     setup_logging()
 
-    ngreen = 0
-    for word in sys.stdin:
-        for ii in range(5):
-            if word[ii] == Global.args.word[ii]:
-                ngreen += 1
-    print(ngreen)
+    if not Global.args.all:
+        if Global.args.word is None:
+            logging.error("Give a word, or -all")
+            sys.exit(1)
+        length = len(Global.args.word)
+        ngreen = 0
+        for word in read_words(sys.stdin, length):
+            for ii in range(length):
+                if word[ii] == Global.args.word[ii]:
+                    ngreen += 1
+        print(ngreen)
+        return
+
+    length = Global.args.length
+    candidates = read_words(sys.stdin, length)
+
+    if Global.args.unigrams is not None:
+        with open_text(Global.args.unigrams) as f:
+            unigrams = read_unigrams(f)
+        weights = [unigrams.get(word, 1) for word in candidates]
+    else:
+        weights = [1] * len(candidates)
+
+    if Global.args.words is not None:
+        with open_text(Global.args.words) as f:
+            guesses = read_words(f, length)
+    else:
+        guesses = candidates
+
+    positional, anywhere = frequencies(candidates, weights, length)
+    greens, yellows = expected(guesses, positional, anywhere)
+
+    if Global.args.rank == 'greens':
+        key = lambda item: item[1]
+    elif Global.args.rank == 'yellows':
+        key = lambda item: item[2]
+    else:
+        key = lambda item: item[1] + item[2]
+    best = TopK(Global.args.top, key)
+    for item in zip(guesses, greens, yellows):
+        best.push(item)
+    for word, green, yellow in best.items():
+        emit(Global.args.format, {'word': word, 'greens': round(float(green), 4), 'yellows': round(float(yellow), 4)},
+             f'{word} {green:.4f} {yellow:.4f}')
 # end main()
 
 
+def read_words(f, length: int) -> List[str]:
+    """Reads the a-z words in f that are length letters long, one per line."""
+    words = []
+    for line in f:
+        word = line.strip()
+        if len(word) == length and all(c in LETTERS for c in word):
+            words.append(word)
+    return words
+# end read_words()
+
+
+def read_unigrams(f):
+    unigrams = {}
+    for line in f:
+        count, word = line.strip().split()
+        unigrams[word] = int(count)
+    return unigrams
+# end read_unigrams()
+
+
+def frequencies(candidates: List[str], weights: List[int], length: int) -> Tuple:
+    """
+    Returns (positional, anywhere) for candidates, which are length letters
+    long, with weights[i] the weight of candidates[i]. positional[i][c] is
+    the share of the weight with letter c at position i, and anywhere[c]
+    the share with c anywhere.
+    """
+    total = sum(weights) or 1
+    if np is not None:
+        codes = encode(candidates, length)
+        w = np.asarray(weights, dtype=np.float64) / total
+        positional = np.zeros((length, 26))
+        for ii in range(length):
+            positional[ii] = np.bincount(codes[:, ii], weights=w, minlength=26)
+        present = np.zeros((len(candidates), 26), dtype=bool)
+        present[np.arange(len(candidates))[:, None], codes] = True
+        anywhere = w @ present
+        return positional, anywhere
+
+    positional = [[0.0] * 26 for _ in range(length)]
+    anywhere = [0.0] * 26
+    for word, weight in zip(candidates, weights):
+        share = weight / total
+        for ii, c in enumerate(word):
+            positional[ii][ord(c) - ord('a')] += share
+        for c in set(word):
+            anywhere[ord(c) - ord('a')] += share
+    return positional, anywhere
+# end frequencies()
+
+
+def expected(guesses: List[str], positional, anywhere) -> Tuple:
+    """Returns (the expected greens, the expected yellows) of each guess."""
+    if np is not None:
+        codes = encode(guesses, len(positional))
+        greens = positional[np.arange(len(positional)), codes].sum(axis=1)
+        present = np.zeros((len(guesses), 26), dtype=bool)
+        present[np.arange(len(guesses))[:, None], codes] = True
+        yellows = np.maximum(present @ anywhere - greens, 0.0)
+        return greens, yellows
+
+    greens = []
+    yellows = []
+    for word in guesses:
+        green = sum(positional[ii][ord(c) - ord('a')] for ii, c in enumerate(word))
+        greens.append(green)
+        yellows.append(max(sum(anywhere[ord(c) - ord('a')] for c in set(word)) - green, 0.0))
+    return greens, yellows
+# end expected()
+
+
+def encode(words: List[str], length: int):
+    """Returns words as an (N, length) array of letter numbers, a being 0."""
+    return (np.frombuffer(''.join(words).encode('ascii'), dtype=np.uint8)
+            .reshape(len(words), length).astype(np.intp) - ord('a'))
+# end encode()
+
+
 def parse_arguments(strs):
     parser = argparse.ArgumentParser(
-        description=f"Description. Version {VERSION}.",
+        description=f"Counts the greens a guess gets against the candidates on stdin. Version {VERSION}.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('-loglevel',
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
                         default='WARNING',
                         help='Logging level')
     parser.add_argument('-version', '--version', action='version', version=str(VERSION))
-    parser.add_argument('word')
+    parser.add_argument('word',
+                        nargs='?')
+    parser.add_argument('-all',
+                        help="Rank every guess by its expected greens and yellows",
+                        action='store_true')
+    parser.add_argument('-length',
+                        help="Word length for -all",
+                        type=int,
+                        default=5)
+    parser.add_argument('-words',
+                        help="Guesses to rank with -all. May be gzipped. Defaults to the candidates")
+    parser.add_argument('-unigrams',
+                        help="Unigram count file to weight the candidates by with -all. May be gzipped")
+    parser.add_argument('-rank',
+                        help="What -all ranks by",
+                        choices=['greens', 'yellows', 'total'],
+                        default='greens')
+    parser.add_argument('-top',
+                        help="Print at most this many guesses with -all. 0 for all",
+                        type=int,
+                        default=0)
+    parser.add_argument('-format',
+                        help="text, or jsonl for one JSON object per guess",
+                        choices=['text', 'jsonl'],
+                        default='text')
     Global.args = parser.parse_args(strs)
 # end parse_arguments()
 
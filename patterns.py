@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+#
+# Wordle feedback patterns.
+#
+# The reply to a guess is encoded as a base-3 integer with one digit per
+# position, position 0 being the least significant digit: 0 for gray (b),
+# 1 for yellow (y) and 2 for green (g). For five letters that fits in a
+# uint8 (0-242).
+#
+# ./patterns.py -words words
+#
+# builds the guess x answer table for the word list and caches it on disk,
+# keyed by a hash of the word list. load_table() memory-maps the cached
+# table, so later runs start instantly and share its pages between processes.
+
+import argparse
+import hashlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from typing import List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+VERSION = 0.1
+
+GRAY = 0
+YELLOW = 1
+GREEN = 2
+
+REPLY_LETTERS = 'byg'
+
+DEFAULT_CACHEDIR = os.path.join(os.path.expanduser('~'), '.cache', 'wordgames')
+
+
+class Global:
+    """Stores globals. There should be no instances of Global."""
+
+    # Command line arguments
+    args = None
+
+# end class Global
+
+
+def main(argv):
+    parse_arguments(argv[1:])
+    setup_logging()
+
+    words = sorted({word.strip() for word in Global.args.words if word.strip()})
+    start = time.time()
+    table = load_table(words, Global.args.cachedir)
+    logging.info(f"Loaded {table.shape} table in {time.time() - start:.2f}s")
+    print(table_path(words, Global.args.cachedir))
+# end main()
+
+
+def feedback(guess: str, answer: str) -> int:
+    """
+    Returns the pattern Wordle shows for guess when the answer is answer.
+    A letter is yellow only as many times as it appears in answer outside
+    the green positions.
+    """
+    pattern = 0
+    remaining = {}
+    for g, a in zip(guess, answer):
+        if g != a:
+            remaining[a] = remaining.get(a, 0) + 1
+    power = 1
+    for g, a in zip(guess, answer):
+        if g == a:
+            pattern += GREEN * power
+        elif remaining.get(g, 0) > 0:
+            remaining[g] -= 1
+            pattern += YELLOW * power
+        power *= 3
+    return pattern
+# end feedback()
+
+
+def all_green(length: int = 5) -> int:
+    """Returns the pattern for a correct guess."""
+    return 3**length - 1
+# end all_green()
+
+
+def pattern_reply(pattern: int, length: int = 5) -> str:
+    """Converts a pattern to a reply string such as 'bygbb'."""
+    reply = ''
+    for _ in range(length):
+        reply += REPLY_LETTERS[pattern % 3]
+        pattern //= 3
+    return reply
+# end pattern_reply()
+
+
+def reply_pattern(reply: str) -> int:
+    """The inverse of pattern_reply()."""
+    pattern = 0
+    for r in reversed(reply):
+        pattern = pattern * 3 + REPLY_LETTERS.index(r)
+    return pattern
+# end reply_pattern()
+
+
+def pattern_dtype(length: int):
+    """Returns the smallest unsigned NumPy type that holds every pattern."""
+    if 3**length <= 1 << 8:
+        return np.uint8
+    if 3**length <= 1 << 16:
+        return np.uint16
+    return np.uint32
+# end pattern_dtype()
+
+
+def letter_matrix(words: List[str]):
+    """Returns words as an (N, L) int array of letter indices 0-25."""
+    length = len(words[0]) if words else 0
+    blob = np.frombuffer(''.join(words).encode('ascii'), dtype=np.uint8)
+    return blob.reshape(len(words), length).astype(np.intp) - ord('a')
+# end letter_matrix()
+
+
+def feedback_row(guess, answers, counts):
+    """
+    Vectorized feedback(). guess is a length-L array of letter indices,
+    answers is an (N, L) letter matrix and counts the matching (N, 26)
+    letter counts. Returns the N patterns as an int array.
+    """
+    length = len(guess)
+    green = answers == guess
+    pattern = np.zeros(len(answers), dtype=np.int64)
+
+    # Count how many of each of the guess's letters are left in each answer
+    # after removing the greens.
+    remaining = {}
+    for c in set(guess.tolist()):
+        remaining[c] = counts[:, c].astype(np.int16)
+    for jj in range(length):
+        remaining[guess[jj]] -= green[:, jj]
+
+    power = 1
+    for jj in range(length):
+        c = guess[jj]
+        yellow = ~green[:, jj] & (remaining[c] > 0)
+        remaining[c] -= yellow
+        pattern += power * (GREEN * green[:, jj] + YELLOW * yellow)
+        power *= 3
+    return pattern
+# end feedback_row()
+
+
+def build_table(words: List[str]):
+    """
+    Returns the N x N table of patterns for words. table[g, a] is
+    feedback(words[g], words[a]).
+    """
+    length = len(words[0]) if words else 0
+    letters = letter_matrix(words)
+    counts = np.zeros((len(words), 26), dtype=np.int16)
+    rows = np.arange(len(words))
+    for jj in range(length):
+        np.add.at(counts, (rows, letters[:, jj]), 1)
+
+    table = np.empty((len(words), len(words)), dtype=pattern_dtype(length))
+    for gg in range(len(words)):
+        table[gg] = feedback_row(letters[gg], letters, counts)
+    return table
+# end build_table()
+
+
+def table_path(words: List[str], cachedir: str = DEFAULT_CACHEDIR) -> str:
+    """Returns where the table for words is cached."""
+    digest = hashlib.sha1('\n'.join(words).encode('utf-8')).hexdigest()
+    return os.path.join(cachedir, f'patterns-{digest[:20]}.npy')
+# end table_path()
+
+
+def load_table(words: List[str], cachedir: str = DEFAULT_CACHEDIR):
+    """
+    Returns the pattern table for words. Without NumPy this is a
+    PatternRows. Otherwise the table is memory-mapped from cachedir,
+    building and saving it first if it isn't there. The order of words
+    matters.
+    """
+    if np is None:
+        return PatternRows(words)
+
+    path = table_path(words, cachedir)
+    if not os.path.exists(path):
+        logging.info(f"Building {len(words)}x{len(words)} pattern table")
+        table = build_table(words)
+        os.makedirs(cachedir, exist_ok=True)
+        # Write to a temporary file first so that a concurrent reader never
+        # sees a partial table.
+        fd, tmppath = tempfile.mkstemp(dir=cachedir, suffix='.npy')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, table)
+        os.replace(tmppath, path)
+        logging.info(f"Saved pattern table to {path}")
+    return np.load(path, mmap_mode='r')
+# end load_table()
+
+
+class PatternRows:
+    """
+    Pure-Python stand-in for the pattern table used when NumPy isn't
+    installed. table[g][a] is computed on first use and kept, so only the
+    pairs that are actually looked at cost anything.
+    """
+
+    def __init__(self, words: List[str]):
+        self.words = list(words)
+        self.rows = {}
+        self.shape = (len(self.words), len(self.words))
+    # end __init__()
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, gi: int) -> 'PatternRow':
+        row = self.rows.get(gi)
+        if row is None:
+            row = PatternRow(self.words[gi], self.words)
+            self.rows[gi] = row
+        return row
+    # end __getitem__()
+
+# end class PatternRows
+
+
+class PatternRow(dict):
+    """One row of a PatternRows. Maps answer index to pattern."""
+
+    def __init__(self, guess: str, words: List[str]):
+        super().__init__()
+        self.guess = guess
+        self.words = words
+    # end __init__()
+
+    def __missing__(self, ai: int) -> int:
+        pattern = feedback(self.guess, self.words[ai])
+        self[ai] = pattern
+        return pattern
+    # end __missing__()
+
+# end class PatternRow
+
+
+def parse_arguments(strs):
+    parser = argparse.ArgumentParser(
+        description=f"Builds and caches the Wordle pattern table. Version {VERSION}.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-loglevel',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        default='INFO',
+                        help='Logging level')
+    parser.add_argument('-version', '--version', action='version', version=str(VERSION))
+    parser.add_argument('-words',
+                        type=argparse.FileType('r'),
+                        default='words')
+    parser.add_argument('-cachedir',
+                        help="Directory for cached pattern tables",
+                        default=DEFAULT_CACHEDIR)
+    Global.args = parser.parse_args(strs)
+    if np is None:
+        parser.error("Building the pattern table requires numpy")
+# end parse_arguments()
+
+
+def setup_logging():
+    numeric_level = getattr(logging, Global.args.loglevel, None)
+    if not isinstance(numeric_level, int):
+        raise ValueError(f'Invalid log level: {Global.args.loglevel}')
+    logging.basicConfig(level=numeric_level,
+                        format="%(module)s:%(levelname)s:%(asctime)s: %(message)s",
+                        datefmt='%Y-%m-%d %H:%M:%S')
+# end setup_logging()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
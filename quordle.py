@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+#
+# A solver for multi-board Wordle variants, such as Dordle (2 boards),
+# Quordle (4) and Octordle (8), where every guess is played on all of the
+# boards that aren't solved yet.
+#
+# ./quordle.py -boards 4 -strategy entropy
+#
+# suggests each guess; enter the guess you made (or nothing to use the
+# suggestion), then the reply on each unsolved board. With -answers, plays
+# itself against the given answers instead and prints the guesses.
+#
+# Each board is a solve2.Solver. The replies to a guess are applied with one
+# table.select_many() call over all the boards' candidates, and the next
+# guess is chosen by strategy.best_multi_guess(), which scores every guess
+# against all the unsolved boards' candidates at once. A board that's down
+# to one candidate is solved next, since that guess has to be made anyway.
+
+import argparse
+import logging
+import os
+import re
+import sys
+
+from typing import List, Optional
+
+import patterns
+import solve2
+import strategy
+
+from patterns import feedback, pattern_reply
+from wordindex import WordBuckets
+from wordmatrix import make_table
+
+VERSION = 0.1
+
+
+class Global:
+    """Stores globals. There should be no instances of Global."""
+
+    # Command line arguments
+    args = None
+
+# end class Global
+
+
+def main(argv):
+    parse_arguments(argv[1:])
+    setup_logging()
+
+    length = Global.args.length
+    buckets = WordBuckets(Global.args.words, Global.args.unigrams, Global.args.index)
+    words = buckets.words(length)
+    unigrams = buckets.counts(length)
+    table = make_table(words, Global.args.backend)
+    patterntable = patterns.load_table(table.words, Global.args.cachedir)
+    pool = strategy.make_pool(patterntable, Global.args.processes)
+
+    if Global.args.answers and not set(Global.args.answers) <= set(words):
+        logging.error(f"Not in the word list: {' '.join(sorted(set(Global.args.answers) - set(words)))}")
+        sys.exit(1)
+    nboards = len(Global.args.answers) if Global.args.answers else Global.args.boards
+    solver = MultiSolver(table, unigrams, nboards, Global.args.strategy, patterntable, pool)
+
+    first = Global.args.first
+    if first is None:
+        first = 'aeros' if length == 5 else ''
+
+    if Global.args.answers:
+        guesses = play(solver, Global.args.answers, first or solver.next_guess())
+        print(' '.join(guesses))
+        print(f"Solved {nboards} boards in {len(guesses)} guesses")
+        return
+
+    nextguess = first or solver.next_guess()
+    while True:
+        print(f"Enter your guess (or undo), or nothing to use {nextguess}: ", end='')
+        guess = input().strip().lower()
+        if guess == 'undo':
+            if not solver.undo():
+                print("Nothing to undo.")
+                continue
+            nextguess = solver.next_guess()
+            print(f"Undone. Next guess: {nextguess}")
+            continue
+        if guess == '':
+            guess = nextguess
+        if len(guess) != length:
+            print(f"The guess must be exactly {length} letters.")
+            continue
+
+        replies = []
+        for bb in solver.unsolved():
+            print(f"Enter the reply to {guess} on board {bb + 1}: ", end='')
+            reply = input().strip()
+            if not re.match(f'[byg]{{{length}}}$', reply):
+                break
+            replies.append(reply)
+        if len(replies) != len(solver.unsolved()):
+            print(f"Each reply must be exactly {length} letters long consisting of only b, y, or g "
+                  "(for black, yellow, and green).")
+            continue
+
+        try:
+            solver.update(guess, replies)
+        except ValueError as e:
+            print(e)
+            continue
+
+        if not solver.unsolved():
+            print("Success! All boards solved.")
+            sys.exit(0)
+
+        for bb in solver.unsolved():
+            words = solver.boards[bb].words
+            if len(words) == 0:
+                logging.error(f"Board {bb + 1} has no candidates. This shouldn't happen.")
+            elif len(words) < 5:
+                print(f"Board {bb + 1} candidates: {' '.join(words)}")
+            else:
+                print(f"Board {bb + 1} candidates: {len(words)}")
+        if any(len(solver.boards[bb].survivors) == 0 for bb in solver.unsolved()):
+            print("If a reply was mistyped, enter undo.")
+            continue
+
+        nextguess = solver.next_guess()
+        print(f"Next guess: {nextguess}")
+# end main()
+
+
+class MultiSolver:
+    """
+    The state of a game on nboards boards at once: a solve2.Solver for each
+    board, and which boards are solved. The arguments are as for
+    solve2.Solver; a pattern-based strategy is required.
+    """
+
+    def __init__(self, table, unigrams, nboards: int, strategyname: str = 'entropy',
+                 patterntable=None, pool=None):
+        self.table = table
+        self.strategy = strategyname
+        self.patterntable = patterntable
+        self.pool = pool
+        self.boards = [solve2.Solver(table, unigrams, strategyname, patterntable) for _ in range(nboards)]
+        self.solved = [False] * nboards
+
+        # For each update(), the boards it updated and the solved flags
+        # before it, for undo().
+        self.history = []
+    # end __init__()
+
+    def unsolved(self) -> List[int]:
+        """Returns the indices of the boards that aren't solved yet."""
+        return [bb for bb, solved in enumerate(self.solved) if not solved]
+    # end unsolved()
+
+    def update(self, guess: str, replies: List[str]):
+        """
+        Applies guess, with replies[i] the reply on the i-th unsolved board.
+        Raises ValueError, changing nothing, if a reply contradicts an
+        earlier one.
+        """
+        unsolved = self.unsolved()
+        if len(replies) != len(unsolved):
+            raise ValueError(f"Expected {len(unsolved)} replies, got {len(replies)}")
+        updated = []
+        constraints = []
+        solved = list(self.solved)
+        try:
+            for bb, reply in zip(unsolved, replies):
+                if reply == 'g' * len(reply):
+                    self.solved[bb] = True
+                else:
+                    constraints.append(self.boards[bb].constrain(guess, reply))
+                    updated.append(bb)
+        except ValueError:
+            for bb in updated:
+                self.boards[bb].undo()
+            self.solved = solved
+            raise
+
+        # Every board's survivors are filtered in one call.
+        keeps = self.table.select_many(constraints, [self.boards[bb].survivors for bb in updated])
+        for bb, keep in zip(updated, keeps):
+            self.boards[bb].narrow(keep)
+        self.history.append((updated, solved))
+    # end update()
+
+    def undo(self) -> bool:
+        """Takes back the last update(). Returns False if there's nothing to undo."""
+        if not self.history:
+            return False
+        updated, self.solved = self.history.pop()
+        for bb in updated:
+            self.boards[bb].undo()
+        return True
+    # end undo()
+
+    def next_guess(self) -> Optional[str]:
+        """Returns the suggested next guess, or None if every board is solved."""
+        unsolved = self.unsolved()
+        if not unsolved:
+            return None
+        words = self.table.words
+        boards = [self.boards[bb].survivors for bb in unsolved]
+        for survivors in boards:
+            if len(survivors) == 1:
+                return words[survivors[0]]
+
+        # Candidates first, so that they win ties.
+        candidates = list(dict.fromkeys(ii for survivors in boards for ii in survivors))
+        candidateset = set(candidates)
+        guesses = candidates + [ii for ii in range(len(words)) if ii not in candidateset]
+
+        guess, cost = strategy.best_multi_guess(self.patterntable, guesses, boards, self.strategy, self.pool)
+        if self.strategy == 'entropy':
+            bits = sum(strategy.entropy(0, len(survivors)) for survivors in boards) - cost
+            logging.debug(f"Entropy of {words[guess]}: {bits:.3f} bits")
+        else:
+            logging.debug(f"Cost of {words[guess]}: {cost}")
+        return words[guess]
+    # end next_guess()
+
+# end class MultiSolver
+
+
+def play(solver: MultiSolver, answers: List[str], first: str, maxguesses: int = 50) -> List[str]:
+    """Plays solver against answers, one per board. Returns the guesses made."""
+    guesses = []
+    guess = first
+    while guess is not None and len(guesses) < maxguesses:
+        guesses.append(guess)
+        solver.update(guess, [pattern_reply(feedback(guess, answers[bb]), len(guess)) for bb in solver.unsolved()])
+        guess = solver.next_guess()
+    return guesses
+# end play()
+
+
+def parse_arguments(strs):
+    parser = argparse.ArgumentParser(
+        description=f"Solves multi-board Wordle games such as Quordle. Version {VERSION}.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-loglevel',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        default='WARNING',
+                        help='Logging level')
+    parser.add_argument('-version', '--version', action='version', version=str(VERSION))
+    parser.add_argument('-words',
+                        help="Word list. May be gzipped",
+                        default='words')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -words and -unigrams")
+    parser.add_argument('-length',
+                        help="Word length",
+                        type=int,
+                        default=5)
+    parser.add_argument('-backend',
+                        help="How to filter words. auto uses numpy if it's installed",
+                        choices=['auto', 'numpy', 'python'],
+                        default='auto')
+    parser.add_argument('-unigrams',
+                        help="Unigram count file. May be gzipped",
+                        default='unigram_counts')
+    parser.add_argument('-boards',
+                        help="Number of boards",
+                        type=int,
+                        default=4)
+    parser.add_argument('-answers',
+                        help="Play against these answers, one per board, instead of asking for replies",
+                        nargs='+')
+    parser.add_argument('-strategy',
+                        help="How to choose the next guess. Each scores every guess by how it splits "
+                             "the candidates on all the boards",
+                        choices=strategy.STRATEGIES,
+                        default='entropy')
+    parser.add_argument('-first',
+                        help="First guess. Defaults to aeros for 5 letters. If empty, -strategy computes it")
+    parser.add_argument('-processes',
+                        help="Worker processes for scoring guesses",
+                        type=int,
+                        default=os.cpu_count())
+    parser.add_argument('-cachedir',
+                        help="Directory for cached pattern tables",
+                        default=patterns.DEFAULT_CACHEDIR)
+    Global.args = parser.parse_args(strs)
+# end parse_arguments()
+
+
+def setup_logging():
+    numeric_level = getattr(logging, Global.args.loglevel, None)
+    if not isinstance(numeric_level, int):
+        raise ValueError(f'Invalid log level: {Global.args.loglevel}')
+    logging.basicConfig(level=numeric_level,
+                        format="%(module)s:%(levelname)s:%(asctime)s: %(message)s",
+                        datefmt='%Y-%m-%d %H:%M:%S')
+# end setup_logging()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
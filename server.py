@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+#
+# A long-running solver service. Loads the word lists once and answers
+# JSON requests over HTTP on a TCP port or a Unix socket:
+#
+# ./server.py -words words.gz -unigrams unigram_counts.gz -dictindex rc.idx
+# curl -s localhost:8765/wordle/next-guess -d '{"history": [["aeros", "byybb"]]}'
+# curl -s --unix-socket /tmp/wordgames.sock http://x/bee/solve -d '{"letters": "tarsoil"}'
+#
+# Requests are POSTs with a JSON object body:
+#
+#   /wordle/filter      {"green": "g...n", "yellow": ["rn", ".", ".", "g", "."],
+#                        "gray": "xfa", "required": "", "limit": 100}
+#   /wordle/next-guess  {"history": [[guess, reply], ...], "strategy": "entropy",
+#                        "hardmode": false, "length": 5}
+#                       Looked up in the -tree decision tree if it was built with
+#                       the same strategy, hardmode and length, and the game is
+#                       still in it.
+#
+# Wordle requests can be for any of the -lengths. The length is taken from
+# green or the first guess, or else "length", or else the first of -lengths.
+#   /bee/solve          {"letters": "tarsoil", "mincount": 200}
+#   /wordament/solve    {"letters": "pmrepea[en]rihbbslt", "rows": 4, "cols": 4}
+#
+# The event loop only parses requests. The solving is done in a pool of
+# worker processes forked after everything is loaded, so they share the
+# dictionaries copy-on-write.
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import sys
+
+import bee
+import decisiontree
+import patterns
+import solve2
+import strategy
+import wordament
+
+from constraints import Constraints, parse_green
+from wordindex import WordBuckets, WordIndex
+from wordmatrix import make_table
+
+VERSION = 0.1
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class Global:
+    """Stores globals. There should be no instances of Global."""
+
+    # Command line arguments
+    args = None
+
+    # Wordle words (a WordTable or WordMatrix), unigram counts and pattern
+    # table for each length in -lengths.
+    tables = {}
+    unigrams = {}
+    patterntables = {}
+
+    # Optional decisiontree.DecisionTree for next-guess requests, and the
+    # length of its words.
+    tree = None
+    treelength = None
+
+    # The opening guess by (length, strategy, hard mode), filled in by each
+    # worker the first time it's asked, since it doesn't depend on the
+    # request.
+    firstguesses = {}
+
+    # Dictionary index for bee, and the filtered words for wordament.
+    dictindex = None
+    wordament_counts = None
+
+# end class Global
+
+
+class RequestError(Exception):
+    """A request that can't be answered. Reported to the client with status."""
+
+    def __init__(self, status, message):
+        # Both are passed on so that the exception survives pickling back
+        # from a worker.
+        super().__init__(status, message)
+        self.status = status
+        self.message = message
+    # end __init__()
+
+    def __str__(self):
+        return self.message
+
+# end class RequestError
+
+
+def main(argv):
+    parse_arguments(argv[1:])
+    setup_logging()
+
+    load()
+
+    # Fork the workers now, before the event loop exists, so that they
+    # inherit the loaded state.
+    pool = concurrent.futures.ProcessPoolExecutor(
+        Global.args.processes, mp_context=multiprocessing.get_context('fork'))
+    pool.submit(int).result()
+
+    # Exit cleanly on SIGTERM too, so that the workers are shut down.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        asyncio.run(serve(pool))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if Global.args.socket is not None and os.path.exists(Global.args.socket):
+            os.remove(Global.args.socket)
+# end main()
+
+
+def load():
+    """Loads the dictionaries named on the command line into Global."""
+    buckets = WordBuckets(Global.args.words, Global.args.unigrams, Global.args.index)
+    for length in Global.args.lengths:
+        Global.unigrams[length] = buckets.counts(length)
+        Global.tables[length] = make_table(buckets.words(length))
+        Global.patterntables[length] = patterns.load_table(Global.tables[length].words, Global.args.cachedir)
+        logging.info(f"Loaded {len(Global.tables[length])} Wordle words of length {length}")
+    if Global.args.tree is not None:
+        for length in Global.args.lengths:
+            try:
+                Global.tree = decisiontree.DecisionTree(Global.args.tree, Global.tables[length].words)
+            except ValueError:
+                continue
+            Global.treelength = length
+            logging.info(f"Loaded the {Global.tree.strategy} decision tree for length {length}")
+            break
+        else:
+            raise ValueError(f'{Global.args.tree} was built for none of the -lengths word lists')
+
+    if Global.args.dictindex is not None:
+        Global.dictindex = WordIndex(Global.args.dictindex)
+        Global.wordament_counts = wordament.read_index(Global.dictindex, Global.args.wordament_mincount)
+        wordament.Global.trie = wordament.Trie(Global.wordament_counts)
+        logging.info(f"Loaded {len(Global.wordament_counts)} Wordament words")
+# end load()
+
+
+async def serve(pool):
+    async def handle(reader, writer):
+        await handle_connection(reader, writer, pool)
+
+    if Global.args.socket is not None:
+        if os.path.exists(Global.args.socket):
+            os.remove(Global.args.socket)
+        server = await asyncio.start_unix_server(handle, path=Global.args.socket)
+        logging.info(f"Listening on {Global.args.socket}")
+    else:
+        server = await asyncio.start_server(handle, Global.args.host, Global.args.port)
+        logging.info(f"Listening on {Global.args.host}:{Global.args.port}")
+
+    async with server:
+        await server.serve_forever()
+# end serve()
+
+
+async def handle_connection(reader, writer, pool):
+    """Answers HTTP/1.1 requests on one connection until it's closed."""
+    try:
+        while True:
+            requestline = await reader.readline()
+            if not requestline:
+                break
+            method, path, _ = requestline.decode('latin-1').split()
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+            status, result = await dispatch(method, path, body, pool)
+            payload = json.dumps(result).encode('utf-8')
+            writer.write(f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                         f'Content-Type: application/json\r\n'
+                         f'Content-Length: {len(payload)}\r\n\r\n'.encode('latin-1') + payload)
+            await writer.drain()
+
+            if headers.get('connection', '').lower() == 'close':
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+        logging.debug(f"Dropping connection: {e}")
+    finally:
+        writer.close()
+# end handle_connection()
+
+
+async def dispatch(method, path, body, pool):
+    """Returns (status, JSON-able result) for one request."""
+    if method == 'GET' and path == '/health':
+        return 200, {'status': 'ok'}
+
+    handler = ROUTES.get(path)
+    if handler is None:
+        return 404, {'error': f'Unknown path {path}'}
+    if method != 'POST':
+        return 405, {'error': 'Use POST'}
+
+    try:
+        params = json.loads(body or b'{}')
+        if not isinstance(params, dict):
+            raise ValueError('The body must be a JSON object')
+    except ValueError as e:
+        return 400, {'error': f'Bad JSON: {e}'}
+
+    loop = asyncio.get_running_loop()
+    try:
+        return 200, await loop.run_in_executor(pool, handler, params)
+    except RequestError as e:
+        return e.status, {'error': str(e)}
+    except (ValueError, KeyError, TypeError) as e:
+        return 400, {'error': f'{type(e).__name__}: {e}'}
+    except Exception as e:
+        logging.exception(f"Error handling {path}")
+        return 500, {'error': str(e)}
+# end dispatch()
+
+
+def wordle_length(params, length=None) -> int:
+    """
+    Returns the word length for a Wordle request: length, if the request
+    shows it, or the "length" parameter, or the first of -lengths.
+    """
+    if length is None:
+        length = params.get('length', Global.args.lengths[0])
+    if length not in Global.tables:
+        raise RequestError(400, f'No words of length {length}. Start the server with -lengths {length}')
+    return length
+# end wordle_length()
+
+
+def wordle_filter(params):
+    green = params.get('green')
+    length = wordle_length(params, len(parse_green(green)) if green is not None else None)
+    constraints = Constraints(green or '.' * length, params.get('yellow'),
+                              params.get('gray', ''), params.get('required', ''))
+    unigrams = Global.unigrams[length]
+    words = Global.tables[length].filter(constraints)
+    words.sort(key=lambda w: unigrams.get(w, 1), reverse=True)
+    return {'count': len(words), 'candidates': words[:params.get('limit', 100)]}
+# end wordle_filter()
+
+
+def wordle_next_guess(params):
+    name = params.get('strategy', 'entropy')
+    if name != 'letters' and name not in strategy.STRATEGIES:
+        raise ValueError(f'Unknown strategy {name}')
+    history = [(guess.lower(), reply) for guess, reply in params.get('history', [])]
+    length = wordle_length(params, len(history[0][0]) if history else None)
+    patterntable = None if name == 'letters' else Global.patterntables[length]
+    solver = solve2.Solver(Global.tables[length], Global.unigrams[length], name, patterntable, None,
+                           params.get('hardmode', False))
+
+    if not history and name == 'letters' and length == 5:
+        return {'guess': 'aeros', 'remaining': len(solver.survivors)}
+    for guess, reply in history:
+        if len(guess) != length or not re.match(f'[byg]{{{length}}}$', reply):
+            raise ValueError(f'Bad guess and reply: {guess} {reply}')
+        solver.update(guess, reply)
+
+    # Look the guess up in the tree if it was built the same way.
+    node = None
+    tree = Global.tree
+    if (tree is not None and tree.strategy == name and tree.hardmode == solver.hardmode
+            and Global.treelength == length):
+        node = tree.find(history)
+
+    words = solver.words
+    if len(words) == 0:
+        return {'guess': None, 'remaining': 0}
+    if len(words) == 1:
+        guess = words[0]
+    elif node is not None:
+        guess = tree.guess(node)
+    elif not history:
+        key = (length, name, solver.hardmode)
+        if key not in Global.firstguesses:
+            Global.firstguesses[key] = solver.next_guess()
+        guess = Global.firstguesses[key]
+    else:
+        guess = solver.next_guess()
+    if guess is None:
+        guess = words[0]
+    return {'guess': guess, 'remaining': len(words), 'candidates': words[:10]}
+# end wordle_next_guess()
+
+
+def bee_solve(params):
+    if Global.dictindex is None:
+        raise RequestError(503, 'Start the server with -dictindex to solve bees')
+    letters = params['letters'].lower()
+    if not re.match(r'[a-z]+$', letters):
+        raise ValueError(f'Bad letters: {letters}')
+    mincount = params.get('mincount', 200)
+
+    # Kept as by the bee.py command line: pangrams, and the other words used
+    # more than mincount times.
+    pangrams = []
+    others = []
+    for word, count, pangram in bee.keep_words(bee.iter_index(Global.dictindex, letters, 0), mincount):
+        (pangrams if pangram else others).append((word, count))
+    return {'pangrams': sorted(pangrams, key=lambda item: (-item[1], item[0])),
+            'words': sorted(others, key=lambda item: (-len(item[0]), item[0]))}
+# end bee_solve()
+
+
+def wordament_solve(params):
+    if Global.wordament_counts is None:
+        raise RequestError(503, 'Start the server with -dictindex to solve wordaments')
+    word2count = Global.wordament_counts
+    word2score = wordament.solve_letters(params['letters'].lower(), word2count, 'trie',
+                                         params.get('rows', 4), params.get('cols', 4))
+    sortedwords = sorted(word2score, key=lambda w: (word2score[w], word2count[w]), reverse=True)
+    return {'words': [[w, word2count[w], word2score[w]] for w in sortedwords]}
+# end wordament_solve()
+
+
+ROUTES = {
+    '/wordle/filter': wordle_filter,
+    '/wordle/next-guess': wordle_next_guess,
+    '/bee/solve': bee_solve,
+    '/wordament/solve': wordament_solve,
+}
+
+
+def parse_arguments(strs):
+    parser = argparse.ArgumentParser(
+        description=f"Word game solver service. Version {VERSION}.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-loglevel',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        default='INFO',
+                        help='Logging level')
+    parser.add_argument('-version', '--version', action='version', version=str(VERSION))
+    parser.add_argument('-words',
+                        help="Wordle word list. May be gzipped",
+                        default='words')
+    parser.add_argument('-unigrams',
+                        help="Wordle unigram count file. May be gzipped",
+                        default='unigram_counts')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -words and -unigrams")
+    parser.add_argument('-lengths',
+                        help="Wordle word lengths to load",
+                        type=int,
+                        nargs='+',
+                        default=[5])
+    parser.add_argument('-dictindex',
+                        help="Word index built by wordindex.py for bee and wordament")
+    parser.add_argument('-wordament-mincount',
+                        help="Minimum number of times a wordament word must appear",
+                        type=int,
+                        default=1000)
+    parser.add_argument('-tree',
+                        help="Decision tree built by decisiontree.py for next-guess requests")
+    parser.add_argument('-cachedir',
+                        help="Directory for cached pattern tables",
+                        default=patterns.DEFAULT_CACHEDIR)
+    parser.add_argument('-host',
+                        default='127.0.0.1')
+    parser.add_argument('-port',
+                        type=int,
+                        default=8765)
+    parser.add_argument('-socket',
+                        help="Listen on this Unix socket instead of -host and -port")
+    parser.add_argument('-processes',
+                        help="Worker processes",
+                        type=int,
+                        default=os.cpu_count())
+    Global.args = parser.parse_args(strs)
+# end parse_arguments()
+
+
+def setup_logging():
+    numeric_level = getattr(logging, Global.args.loglevel, None)
+    if not isinstance(numeric_level, int):
+        raise ValueError(f'Invalid log level: {Global.args.loglevel}')
+    logging.basicConfig(level=numeric_level,
+                        format="%(module)s:%(levelname)s:%(asctime)s: %(message)s",
+                        datefmt='%Y-%m-%d %H:%M:%S')
+# end setup_logging()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -3,10 +3,19 @@
 
 import argparse
 import collections
+import hashlib
 import logging
-import re
+import os
 import sys
 
+import patterns
+
+from constraints import LETTERS, Constraints, letter_mask
+from letterindex import LetterIndex
+from lrucache import LRUCache
+from wordindex import WordBuckets
+from wordmatrix import make_table
+
 VERSION = 0.1
 
 
@@ -24,24 +33,41 @@ def main(argv):
     setup_logging()
 
     # Wordle is a bit weird in that it will report a letter as gray if
-    # it's already been reported as green or yellow. Remove from gray
-    # any that have been mentioned in yellow or green.
-
-    Global.args.gray -= set(Global.args.green) | set(''.join(Global.args.yellow))
-
-    lettercounts = collections.Counter()
-    candidates = set()
-    words = set()
+    # it's already been reported as green or yellow. Constraints ignores
+    # any gray letter that has been mentioned in yellow or green.
 
-    for word in Global.args.words:
-        word = word.strip()
-        words.add(word)
-        if is_candidate(word, Global.args.green, Global.args.yellow, Global.args.gray):
-            lettercounts.update(word)
-            candidates.add(word)
+    try:
+        constraints = Constraints(Global.args.green, Global.args.yellow, Global.args.gray)
+    except ValueError as e:
+        logging.error(e)
+        sys.exit(1)
 
+    # The letters we have info about.
+    known = (set(Global.args.green) | Global.args.gray | set(''.join(Global.args.yellow))) & set(LETTERS)
+
+    words = WordBuckets(Global.args.words, None, Global.args.index).words(constraints.length)
+
+    # The answer only depends on the words, the constraints and the known
+    # letters, so it's cached under their canonical forms.
+    if Global.args.cache:
+        cache = LRUCache(Global.args.cachesize, Global.args.cache)
+        try:
+            digest = hashlib.sha1('\n'.join(words).encode('utf-8')).hexdigest()[:20]
+            key = f'{digest}/{constraints.key()}/{letter_mask(known):x}'
+            result = cache.get(key)
+            if result is not None:
+                logging.info(f"Found {key} in {Global.args.cache}")
+            else:
+                result = solve(words, constraints, known)
+                cache.put(key, result)
+        finally:
+            cache.close()
+    else:
+        result = solve(words, constraints, known)
+
+    candidates = result['candidates']
     if len(candidates) == 1:
-        print(f"Success: {list(candidates)[0]}")
+        print(f"Success: {candidates[0]}")
         sys.exit(0)
 
     if len(candidates) == 0:
@@ -50,16 +76,36 @@ def main(argv):
 
     logging.info(f"Number of candidates: {len(candidates)}")
 
+    if result['nextguess'] is None:
+        print("All letters found. Candidates are:")
+        print(' ', ' '.join(candidates))
+        sys.exit(0)
+
+    logging.info(f"Informative letters in {result['nextguess']}: {result['count']}")
+    print(f"Next guess: {result['nextguess']}")
+# end main()
+
+
+def solve(words, constraints, known):
+    """
+    Returns {'candidates': the words matching constraints, 'nextguess': the
+    suggested guess, or None if every letter in the candidates is known,
+    'count': the number of unknown letters nextguess has}.
+    """
+    table = make_table(words, Global.args.backend)
+    candidates = table.filter(constraints)
+
+    lettercounts = collections.Counter()
+    for word in candidates:
+        lettercounts.update(word)
+
     # Remove any we have info about.
-    for letter in (set(Global.args.green) |
-                   Global.args.gray |
-                   set(''.join(Global.args.yellow))) - set('.'):
+    for letter in known:
         del lettercounts[letter]
 
-    if len(lettercounts) == 0:
-        print("All letters found. Candidates are:")
-        print(' ', ' '.join(list(candidates)))
-        sys.exit(0)
+    result = {'candidates': candidates, 'nextguess': None, 'count': 0}
+    if len(candidates) <= 1 or len(lettercounts) == 0:
+        return result
 
     # String of the letters we don't have info about, sorted by
     # how frequent they are in the candidates.
@@ -72,95 +118,21 @@ def main(argv):
     # about as possible, prefering letters that are common in
     # the candidates.
 
-    nextguess = None
-
     # If we can find a word where we don't have info on any of
     # its letters, use it. If there are many such words, start
     # with ones that have more common letters.
-    
-    if len(letters) >= 5:
-        for n in range(5, len(letters)):
-            word, count = find_word_with_letters(words, letters[0:n])
-            if count == 5:
-                nextguess = word
-                break
 
-    if nextguess is None:
-        word, count = find_word_with_letters(words, letters)
-        nextguess = word
-
-    logging.info(f"Informative letters in {nextguess}: {count}")
-    print(f"Next guess: {nextguess}")
-# end main()
-
-
-def is_candidate(word, green, yellow, gray):
-    """
-    Arguments:
-
-    word - Input string
-    green - Regular expression that must be five characters. E.g. g...n
-    yellow - A list of give entries. Each entry is a character set that
-             must match. E.g. ['rn', '.', '.', 'g', '.'] means r and n
-             appear, but cannot be in the initial position, and g appears
-             but cannot be in the 4th position.
-    gray - A set containing letters that cannot appear. E.g. {'x', 'f', 'a'}
-           means x, f, and a cannot appear anywhere.
-    """
-
-    # Regular expression matching anything in gray. That is, if gray
-    # contains "abc", then match the regexp [abc].
-
-    grayre = f"[{''.join(gray)}]"
-
-    # The set of all letters that occur anywhere in yellow.  All these
-    # letters must appear in the word somewhere.  For example, if
-    # -yellow . . ae . ab was passed, yellowset will contain
-    # {'a', 'b', 'e'}
+    index = LetterIndex(words)
+    nextguess, _ = index.first_full_cover(letters, constraints.length, constraints.length, len(letters))
+    count = constraints.length
 
-    yellowset = {c for c in ''.join(yellow) if c != '.'}
-
-    # This regular expression fails to matches if yellows appear in
-    # the wrong place. For example, if -yellow . . ae . ab was passed,
-    # yellowre will be '..[^ae].[^ab]'.
-
-    yellowre = ''.join([x if x == '.' else f'[^{x}]' for x in yellow])
-
-    # Not a candidate if any gray matches.
-    if re.search(grayre, word):
-        # print("gray failed")
-        return False
-
-    # Not a candidate if any green doesn't match.
-    if not re.match(Global.args.green, word):
-        # print("green failed")
-        return False
-
-    # Not a candidate if yellowset isn't a subset of the letters in word.
-    if not yellowset <= set(word):
-        # print(f"yellowset failed '{yellowset}'")
-        return False
-
-    # Not a candidate if yellows are in the wrong place.
-    if yellowre != '.....' and not re.match(yellowre, word):
-        # print("yellowre failed")
-        return False
-
-    return True
-# end is_candidate()
-
-
-def find_word_with_letters(words, letters):
-    bestword = None
-    bestcount = -1
-    for word in words:
-        count = len(set(word) & set(letters))
-        if count > bestcount:
-            bestcount = count
-            bestword = word
+    if nextguess is None:
+        nextguess, count = index.best_cover(letters)
 
-    return bestword, bestcount
-# end find_word_with_letters()
+    result['nextguess'] = nextguess
+    result['count'] = count
+    return result
+# end solve()
 
 
 def parse_arguments(strs):
@@ -173,16 +145,30 @@ def parse_arguments(strs):
                         help='Logging level')
     parser.add_argument('-version', '--version', action='version', version=str(VERSION))
     parser.add_argument('-words',
-                        type=argparse.FileType('r'),
+                        help="Word list. May be gzipped",
                         default='words')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -words")
+    parser.add_argument('-backend',
+                        help="How to filter words. auto uses numpy if it's installed",
+                        choices=['auto', 'numpy', 'python'],
+                        default='auto')
     parser.add_argument('-yellow',
-                        nargs=5,
+                        help="One entry per position, as many as there are letters in -green",
+                        nargs='+',
                         required=True)
     parser.add_argument('-green',
                         required=True)
     parser.add_argument('-gray',
                         type=set,
                         required=True)
+    parser.add_argument('-cache',
+                        help="sqlite file caching results between runs, such as "
+                             f"{os.path.join(patterns.DEFAULT_CACHEDIR, 'solve.sqlite')}")
+    parser.add_argument('-cachesize',
+                        help="Most results kept in -cache",
+                        type=int,
+                        default=10000)
     Global.args = parser.parse_args(strs)
 # end parse_arguments()
 
@@ -10,9 +10,19 @@
 import argparse
 import collections
 import logging
+import os
 import re
 import sys
 
+import decisiontree
+import patterns
+import strategy
+
+from constraints import Constraints
+from letterindex import LetterIndex
+from wordindex import WordBuckets
+from wordmatrix import make_table
+
 VERSION = 0.1
 
 
@@ -29,99 +39,84 @@ def main(argv):
     parse_arguments(argv[1:])
     setup_logging()
 
-    # Load initial words
-    words = set()
-    for word in Global.args.words:
-        word = word.strip()
-        words.add(word)
-
-    # Load unigrams
-    unigrams = {}
-    for line in Global.args.unigrams:
-        count, word = line.strip().split()
-        unigrams[word] = int(count)
-
-    # Initialize constraints
-
-    # A regular expression that must be exactly 5 letters.
-    green = '.....'
-
-    # A set containing the letters that cannot appear.
-    gray = set()
-
-    # A list of exactly 5 sets, each containing the letters that cannot
-    # be in that location.
-    yellow = [set(), set(), set(), set(), set()]
-
-    # A set of containing letters that must appear (that is, letters that
-    # were ever yellow or green).
-    required_letters = set()
-
-    # These are the letters we've guessed.
-    guessed_letters = set()
+    length = Global.args.length
+    buckets = WordBuckets(Global.args.words, Global.args.unigrams, Global.args.index)
+    words = buckets.words(length)
+    unigrams = buckets.counts(length)
+    table = make_table(words, Global.args.backend)
+
+    # The pattern table and worker pool used by the pattern-based strategies.
+    patterntable = None
+    pool = None
+    if Global.args.strategy != 'letters':
+        patterntable = patterns.load_table(table.words, Global.args.cachedir)
+        pool = strategy.make_pool(patterntable, Global.args.processes)
+
+    solver = Solver(table, unigrams, Global.args.strategy, patterntable, pool, Global.args.hardmode)
+
+    # Where we are in the decision tree, if there is one. None once the
+    # game leaves the tree, after which guesses come from solver.
+    tree = None
+    node = None
+    if Global.args.tree is not None:
+        tree = decisiontree.DecisionTree(Global.args.tree, table.words)
+        node = tree.root
+        logging.info(f"Using the {tree.strategy} tree in {Global.args.tree}")
 
     # This is used to initialize guess.
-    nextguess = 'aeros'
+    nextguess = Global.args.first
+    if nextguess is None:
+        nextguess = 'aeros' if length == 5 else ''
+    if node is not None:
+        nextguess = tree.guess(node)
+    elif nextguess == '':
+        nextguess = solver.next_guess()
+
+    # The suggested guesses and tree nodes before each update, for undo.
+    previous = []
 
     while True:
         reply = None
-        print(f"Enter your guess or wordle's reply to {nextguess}: ", end='')
+        print(f"Enter your guess or wordle's reply to {nextguess} (or undo): ", end='')
         guess = input().strip().lower()
+        if guess == 'undo':
+            if not solver.undo():
+                print("Nothing to undo.")
+                continue
+            nextguess, node = previous.pop()
+            print(f"Undone. Remaining candidates: {len(solver.survivors)}")
+            continue
         if nextguess != '' and (guess == '' or all((c in 'ybg' for c in guess))):
             print(f"Using {nextguess}")
             reply = guess
             guess = nextguess
-        if len(guess) != 5:
-            print("The guess must be exactly 5 letters.")
+        if len(guess) != length:
+            print(f"The guess must be exactly {length} letters.")
             continue
-        guessed_letters.update(guess)
         if reply is None:
             print("Enter Wordle's reply: ", end='')
             reply = input().strip()
-        if not re.match(r'[byg]{5}$', reply):
-            print("The reply must be exactly 5 letters long consisting of only b, y, or g (for black, yellow, and green).")
+        if not re.match(f'[byg]{{{length}}}$', reply):
+            print(f"The reply must be exactly {length} letters long consisting of only b, y, or g "
+                  "(for black, yellow, and green).")
             continue
 
-        for ii, r in enumerate(reply):
-            c = guess[ii]
-
-            # Wordle will report a letter as gray even if it was previously reported as yellow or
-            # green if it's in a different position. So when checking from gray, don't include
-            # required letters.
-
-            if r == 'b' and c not in required_letters:
-                gray.add(c)
-            elif r == 'g':
-                if green[ii] != '.' and green[ii] != c:
-                    print(f"You are reporting a green {c} at position {ii}, but already reported a green {green[ii]} there.")
-                    break
-                # TODO: Make sure any yellow are consistent too.
-                required_letters.add(c)
-                green = green[:ii] + c + green[ii+1:]
-            if r == 'y':
-                # TODO: Make sure this are consistent.
-                required_letters.add(c)
-                yellow[ii].add(c)
-
-        logging.info(f"gray {gray}")
-        logging.info(f"yellow {yellow}")
-        logging.info(f"green {green}")
-
-        # We have new contraints. Remove any word from words that doesn't match the contraints.
-        # Keep track of letter counts in the remaining.
-
-        lettercounts = collections.Counter()
-        for word in list(words):
-            if not is_candidate(word, gray, yellow, green, required_letters):
-                words.remove(word)
-                lettercounts.update(word)
+        try:
+            solver.update(guess, reply)
+        except ValueError as e:
+            print(e)
+            continue
+        previous.append((nextguess, node))
+        if tree is not None:
+            node = tree.child(node, guess, reply)
 
-        # Sort words by unigram counts
-        words = sorted(words, key=lambda w: unigrams.get(w, 1), reverse=True)
+        words = solver.words
 
         if len(words) == 0:
             logging.error("There are no candidates. This shouldn't happen.")
-            sys.exit(1)
+            print("If the reply was mistyped, enter undo.")
+            nextguess = ''
+            continue
 
         if len(words) == 1:
             print(f"Success! {list(words)[0]}")
@@ -132,15 +127,209 @@ def main(argv):
         else:
             print(f"Remaining candidates: {len(words)}")
 
+        nextguess = tree.guess(node) if node is not None else solver.next_guess()
+        if nextguess is None:
+            print("All letters found. Candidates are:")
+            print(' ', ' '.join(list(words)))
+            sys.exit(0)
+
+        print(f"Next guess: {nextguess}")
+# end main()
+
+
+class Solver:
+    """
+    The state of one game: the constraints from the replies so far and the
+    words still consistent with them.
+
+    The survivors are kept most common first from the start. Each update()
+    only checks the survivors against the constraints from that one reply,
+    so rounds after the first cost time proportional to the number of
+    survivors rather than the size of the dictionary. Each update() saves
+    the previous state so that undo() can take it back.
+
+    table - A constraints.WordTable or wordmatrix.WordMatrix of every word.
+    unigrams - Maps words to counts. Candidates are kept most common first.
+    strategy - 'letters' or one of strategy.STRATEGIES.
+    patterntable - The patterns.load_table() table for table.words. Only
+                   needed for the pattern-based strategies.
+    pool - Optional pool from strategy.make_pool().
+    hardmode - Only guess words that are still candidates.
+    """
+
+    def __init__(self, table, unigrams, strategy='letters', patterntable=None, pool=None,
+                 hardmode=False):
+        self.table = table
+        self.unigrams = unigrams
+        self.strategy = strategy
+        self.patterntable = patterntable
+        self.pool = pool
+        self.hardmode = hardmode
+
+        # The length of the words.
+        self.length = len(table.words[0]) if len(table) else 0
+
+        # A regular expression that must be exactly length letters.
+        self.green = '.' * self.length
+
+        # A set containing the letters that cannot appear.
+        self.gray = set()
+
+        # A list of exactly length sets, each containing the letters that
+        # cannot be in that location.
+        self.yellow = [set() for _ in range(self.length)]
+
+        # A set of containing letters that must appear (that is, letters that
+        # were ever yellow or green).
+        self.required_letters = set()
+
+        # These are the letters we've guessed.
+        self.guessed_letters = set()
+
+        # Indices into table of the words that are still candidates, most
+        # common first.
+        words = table.words
+        self.survivors = sorted(range(len(table)), key=lambda ii: unigrams.get(words[ii], 1), reverse=True)
+
+        # For the letters strategy, a LetterIndex of the words in that
+        # order, built once, and the position of each table index in it, so
+        # that next_guess() only has to mark which words are left.
+        self.letterindex = None
+        self.positions = None
+        if patterntable is None:
+            self.letterindex = LetterIndex(self.words)
+            self.positions = {ii: pos for pos, ii in enumerate(self.survivors)}
+
+        # Letter counts in the words removed by the last update().
+        self.lettercounts = collections.Counter()
+
+        # Saved states for undo().
+        self.history = []
+    # end __init__()
+
+    @property
+    def words(self):
+        """The remaining candidates, most common first."""
+        return [self.table.words[ii] for ii in self.survivors]
+
+    def update(self, guess, reply):
+        """
+        Adds the constraints from Wordle's reply to guess and removes the
+        words that are no longer candidates. Raises ValueError if the reply
+        contradicts an earlier one.
+        """
+        self.narrow(self.table.select(self.constrain(guess, reply), self.survivors))
+    # end update()
+
+    def constrain(self, guess, reply) -> Constraints:
+        """
+        The first half of update(): adds the constraints from reply to guess
+        and returns the Constraints from just this reply, which the
+        survivors must then be selected with and passed to narrow(). Raises
+        ValueError, changing nothing, if the reply contradicts an earlier
+        one.
+        """
+        for ii, r in enumerate(reply):
+            c = guess[ii]
+            if r == 'g' and self.green[ii] != '.' and self.green[ii] != c:
+                raise ValueError(f"You are reporting a green {c} at position {ii}, "
+                                 f"but already reported a green {self.green[ii]} there.")
+
+        self.history.append((self.green, set(self.gray), [set(x) for x in self.yellow],
+                             set(self.required_letters), set(self.guessed_letters),
+                             self.survivors, self.lettercounts))
+
+        # The constraints from just this reply.
+        roundgreen = ['.'] * len(reply)
+        roundyellow = [set() for _ in reply]
+        roundgray = set()
+
+        self.guessed_letters.update(guess)
+        for ii, r in enumerate(reply):
+            c = guess[ii]
+
+            # Wordle will report a letter as gray even if it was previously reported as yellow or
+            # green if it's in a different position. So when checking from gray, don't include
+            # required letters.
+
+            if r == 'b' and c not in self.required_letters:
+                self.gray.add(c)
+                roundgray.add(c)
+            elif r == 'g':
+                # TODO: Make sure any yellow are consistent too.
+                self.required_letters.add(c)
+                self.green = self.green[:ii] + c + self.green[ii+1:]
+                roundgreen[ii] = c
+            if r == 'y':
+                # TODO: Make sure this are consistent.
+                self.required_letters.add(c)
+                self.yellow[ii].add(c)
+                roundyellow[ii].add(c)
+
+        # A letter that's gray here but yellow or green elsewhere still isn't
+        # at this position.
+        for ii, r in enumerate(reply):
+            if r == 'b' and guess[ii] in self.required_letters:
+                self.yellow[ii].add(guess[ii])
+                roundyellow[ii].add(guess[ii])
+
+        logging.debug(f"gray {self.gray}")
+        logging.debug(f"yellow {self.yellow}")
+        logging.debug(f"green {self.green}")
+
+        # We have new contraints. The survivors already match the earlier ones, so
+        # only the ones that don't match this reply need to be removed.
+        return Constraints(''.join(roundgreen), roundyellow, roundgray - self.required_letters)
+    # end constrain()
+
+    def narrow(self, keep):
+        """
+        The second half of update(): keep is the survivors that match the
+        Constraints from constrain(), in order, as select() returns them,
+        so they stay sorted by unigram counts. Keeps track of letter counts
+        in the removed words.
+        """
+        kept = set(keep)
+
+        self.lettercounts = collections.Counter()
+        for ii in self.survivors:
+            if ii not in kept:
+                self.lettercounts.update(self.table.words[ii])
+        self.survivors = keep
+    # end narrow()
+
+    def undo(self):
+        """Takes back the last update(). Returns False if there's nothing to undo."""
+        if not self.history:
+            return False
+        (self.green, self.gray, self.yellow, self.required_letters, self.guessed_letters,
+         self.survivors, self.lettercounts) = self.history.pop()
+        return True
+    # end undo()
+
+    def next_guess(self):
+        """
+        Returns the suggested next guess. With the letters strategy, returns
+        None if there are no letters left that we don't know about.
+        """
+        if self.patterntable is not None:
+            return self.pattern_guess()
+
+        words = self.words
+
+        # Before the first guess, use the letter counts of every word.
+        if self.history:
+            lettercounts = self.lettercounts.copy()
+        else:
+            lettercounts = collections.Counter(''.join(words))
+
         # Remove letters we've guessed already.
 
-        for letter in guessed_letters:
+        for letter in self.guessed_letters:
             del lettercounts[letter]
 
         if len(lettercounts) == 0:
-            print("All letters found. Candidates are:")
-            print(' ', ' '.join(list(words)))
-            sys.exit(0)
+            return None
 
         # String of the letters we don't have info about, sorted by
         # how frequent they are in the candidates.
@@ -153,61 +342,44 @@ def main(argv):
         # about as possible, prefering letters that are common in
         # the candidates.
 
-        nextguess = None
-
         # If we can find a word where we don't have info on any of
         # its letters, use it. If there are many such words, start
         # with ones that have more common letters.
 
-        if len(letters) >= 5:
-            for n in range(5, len(letters)):
-                word, count = find_word_with_letters(words, letters[0:n])
-                if count == 5:
-                    nextguess = word
-                    break
+        index = self.letterindex
+        within = index.bitset(self.positions[ii] for ii in self.survivors)
+        nextguess, _ = index.first_full_cover(letters, self.length, self.length, len(letters), within)
+        count = self.length
 
         if nextguess is None:
-            word, count = find_word_with_letters(words, letters)
-            nextguess = word
+            nextguess, count = index.best_cover(letters, within)
 
         logging.info(f"Informative letters in {nextguess}: {count}")
-        print(f"Next guess: {nextguess}")
-# end main()
-
-
-def is_candidate(word, gray, yellow, green, required_letters):
-    # Convert gray to a regexp class. If any letter matches, not a candidate.
-    if re.search(f"[{''.join(gray)}]", word):
-        return False
-
-    # Not a candidate if green doesn't match.
-    if not re.match(green, word):
-        return False
-
-    # All required letters must be present
-    if not required_letters <= set(word):
-        return False
-
-    # Not a candidate if any of the yellows are in the wrong place.
-    yellowre = ''.join(['.' if not x else f"[^{''.join(x)}]" for x in yellow])
-    if yellowre != '.....' and not re.match(yellowre, word):
-        return False
-
-    return True
-# end is_candidate()
-
+        return nextguess
+    # end next_guess()
+
+    def pattern_guess(self):
+        """
+        Returns the guess that best splits the survivors according to the
+        strategy. Candidates are tried first so that they win ties.
+        """
+        words = self.table.words
+        survivors = self.survivors
+        if self.hardmode:
+            guesses = survivors
+        else:
+            survivorset = set(survivors)
+            guesses = survivors + [ii for ii in range(len(words)) if ii not in survivorset]
 
-def find_word_with_letters(words, letters):
-    bestword = None
-    bestcount = -1
-    for word in words:
-        count = len(set(word) & set(letters))
-        if count > bestcount:
-            bestcount = count
-            bestword = word
+        guess, cost = strategy.best_guess(self.patterntable, guesses, survivors, self.strategy, self.pool)
+        if self.strategy == 'entropy':
+            logging.debug(f"Entropy of {words[guess]}: {strategy.entropy(cost, len(survivors)):.3f} bits")
+        else:
+            logging.debug(f"Cost of {words[guess]}: {cost}")
+        return words[guess]
+    # end pattern_guess()
 
-    return bestword, bestcount
-# end find_word_with_letters()
+# end class Solver
 
 
 def parse_arguments(strs):
@@ -220,11 +392,43 @@ def parse_arguments(strs):
                         help='Logging level')
     parser.add_argument('-version', '--version', action='version', version=str(VERSION))
     parser.add_argument('-words',
-                        type=argparse.FileType('r'),
+                        help="Word list. May be gzipped",
                         default='words')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -words and -unigrams")
+    parser.add_argument('-length',
+                        help="Word length",
+                        type=int,
+                        default=5)
+    parser.add_argument('-backend',
+                        help="How to filter words. auto uses numpy if it's installed",
+                        choices=['auto', 'numpy', 'python'],
+                        default='auto')
     parser.add_argument('-unigrams',
-                        type=argparse.FileType('r'),
+                        help="Unigram count file. May be gzipped",
                         default='unigram_counts')
+    parser.add_argument('-strategy',
+                        help="How to choose the next guess. letters prefers words with common "
+                             "letters we know nothing about. The others score every guess by how "
+                             "it splits the candidates",
+                        choices=['letters'] + list(strategy.STRATEGIES),
+                        default='letters')
+    parser.add_argument('-hardmode',
+                        help="With a pattern-based -strategy, only guess words that are still candidates",
+                        action='store_true')
+    parser.add_argument('-first',
+                        help="First guess. Defaults to aeros for 5 letters. If empty, a pattern-based "
+                             "-strategy computes it")
+    parser.add_argument('-tree',
+                        help="Decision tree built by decisiontree.py. Guesses are looked up in it until "
+                             "the game leaves it")
+    parser.add_argument('-processes',
+                        help="Worker processes for scoring guesses",
+                        type=int,
+                        default=os.cpu_count())
+    parser.add_argument('-cachedir',
+                        help="Directory for cached pattern tables",
+                        default=patterns.DEFAULT_CACHEDIR)
     Global.args = parser.parse_args(strs)
 # end parse_arguments()
 
@@ -0,0 +1,299 @@
+#
+# Next-guess selection for Wordle by scoring how each guess splits the
+# remaining candidates into buckets by feedback pattern.
+#
+# Every strategy is written as a cost to minimize, where c is the size of a
+# bucket:
+#
+#   entropy        sum of c*log2(c). Minimizing this maximizes the entropy of
+#                  the pattern distribution, log2(n) - cost/n.
+#   expected-size  sum of c*c, which is n times the expected number of
+#                  candidates left after the guess.
+#   minimax        max of c, the number left in the worst case.
+#
+# All three costs only grow as candidates are added to buckets, so in the
+# pure-Python path a guess is abandoned as soon as its partial cost is worse
+# than the best complete cost seen so far. The NumPy path scores blocks of
+# guesses at once with bincount and doesn't need the cutoff.
+#
+# Patterns come from a table as returned by patterns.load_table(), indexed
+# as table[guess][answer].
+#
+# For multi-board games such as Quordle, where each guess is played on
+# several boards at once, a guess's cost is the sum over the boards of its
+# cost per candidate on that board (for minimax, of its cost on each board),
+# so that the entropy strategy maximizes the total bits gained. Each guess's
+# patterns against the candidates of all the boards are read from the table
+# once and then split up by board.
+
+import math
+import multiprocessing
+
+from typing import List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STRATEGIES = ('entropy', 'expected-size', 'minimax')
+
+# Number of guesses scored at once by the NumPy path.
+BLOCK = 256
+
+# Set in pool workers by make_pool(). Workers are forked, so the table
+# (usually memory-mapped) is shared rather than copied.
+_table = None
+
+
+def bucket_costs(strategy: str, n: int) -> List[float]:
+    """
+    Returns deltas where deltas[c] is how much the cost grows when a bucket
+    grows from c to c+1 candidates, for buckets of up to n.
+    """
+    if strategy == 'entropy':
+        f = [0.0] + [c * math.log2(c) for c in range(1, n + 2)]
+    elif strategy == 'expected-size':
+        f = [c * c for c in range(n + 2)]
+    else:
+        raise ValueError(f'Unknown strategy: {strategy}')
+    return [f[c + 1] - f[c] for c in range(n + 1)]
+# end bucket_costs()
+
+
+def guess_cost(row: Sequence[int], candidates: Sequence[int], strategy: str,
+               bound: float = math.inf, deltas: Optional[List[float]] = None) -> Optional[float]:
+    """
+    Returns the cost of the guess whose pattern row is row, or None if it
+    is certain to be greater than bound.
+    """
+    counts = {}
+    if strategy == 'minimax':
+        for a in candidates:
+            p = row[a]
+            c = counts.get(p, 0) + 1
+            if c > bound:
+                return None
+            counts[p] = c
+        return max(counts.values(), default=0)
+
+    if deltas is None:
+        deltas = bucket_costs(strategy, len(candidates))
+    cost = 0
+    for a in candidates:
+        p = row[a]
+        c = counts.get(p, 0)
+        counts[p] = c + 1
+        cost += deltas[c]
+        if cost > bound:
+            return None
+    return cost
+# end guess_cost()
+
+
+def block_costs(table, guesses: Sequence[int], candidates: Sequence[int], strategy: str):
+    """NumPy version of guess_cost() for a block of guesses at once."""
+    return pattern_costs(np.asarray(table[np.ix_(guesses, candidates)], dtype=np.int64), strategy)
+# end block_costs()
+
+
+def pattern_costs(block, strategy: str):
+    """Returns the cost of each row of block, an int64 array of patterns."""
+    npatterns = int(block.max()) + 1 if block.size else 1
+    offsets = np.arange(len(block))[:, None] * npatterns
+    counts = np.bincount((block + offsets).ravel(), minlength=len(block) * npatterns)
+    counts = counts.reshape(len(block), npatterns).astype(np.float64)
+    if strategy == 'minimax':
+        return counts.max(axis=1)
+    if strategy == 'expected-size':
+        return (counts * counts).sum(axis=1)
+    if strategy == 'entropy':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(counts > 0, counts * np.log2(counts), 0).sum(axis=1)
+    raise ValueError(f'Unknown strategy: {strategy}')
+# end pattern_costs()
+
+
+def best_in(table, guesses: Sequence[int], candidates: Sequence[int],
+            strategy: str) -> Tuple[tuple, int]:
+    """
+    Returns ((cost, 0 if the guess is a candidate else 1, position in
+    guesses), guess) for the best guess. Smaller is better, so ties go to
+    candidates and then to earlier guesses.
+    """
+    candidateset = set(candidates)
+    best = ((math.inf, 1, len(guesses)), None)
+
+    if np is not None and isinstance(table, np.ndarray):
+        candidates = np.asarray(candidates, dtype=np.intp)
+        for start in range(0, len(guesses), BLOCK):
+            chunk = guesses[start:start + BLOCK]
+            costs = block_costs(table, chunk, candidates, strategy)
+            for ii, cost in enumerate(costs.tolist()):
+                key = (cost, 0 if chunk[ii] in candidateset else 1, start + ii)
+                if key < best[0]:
+                    best = (key, chunk[ii])
+        return best
+
+    deltas = None if strategy == 'minimax' else bucket_costs(strategy, len(candidates))
+    for ii, guess in enumerate(guesses):
+        cost = guess_cost(table[guess], candidates, strategy, best[0][0], deltas)
+        if cost is None:
+            continue
+        key = (cost, 0 if guess in candidateset else 1, ii)
+        if key < best[0]:
+            best = (key, guess)
+    return best
+# end best_in()
+
+
+def _best_in_chunk(args):
+    start, guesses, candidates, strategy = args
+    (cost, iscandidate, position), guess = best_in(_table, guesses, candidates, strategy)
+    return (cost, iscandidate, start + position), guess
+# end _best_in_chunk()
+
+
+def make_pool(table, processes: int):
+    """
+    Returns a process pool whose workers score guesses against table, or
+    None if processes is 1 or fork isn't available.
+    """
+    global _table
+    if processes <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    _table = table
+    return multiprocessing.get_context('fork').Pool(processes)
+# end make_pool()
+
+
+def best_guess(table, guesses: Sequence[int], candidates: Sequence[int],
+               strategy: str = 'entropy', pool=None) -> Tuple[int, float]:
+    """
+    Returns (guess, cost) for the guess in guesses that best splits
+    candidates, both given as indices into table. If pool (from
+    make_pool()) is given, guesses are split across its workers.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f'Unknown strategy: {strategy}')
+    if len(candidates) == 1:
+        return candidates[0], 0
+    guesses = list(guesses)
+    candidates = list(candidates)
+
+    if pool is None or len(guesses) < 2 * BLOCK:
+        (cost, _, _), guess = best_in(table, guesses, candidates, strategy)
+        return guess, cost
+
+    size = max(BLOCK, len(guesses) // 64)
+    tasks = [(start, guesses[start:start + size], candidates, strategy)
+             for start in range(0, len(guesses), size)]
+    (cost, _, _), guess = min(pool.imap_unordered(_best_in_chunk, tasks))
+    return guess, cost
+# end best_guess()
+
+
+def multi_guess_cost(row: Sequence[int], boards: List[Sequence[int]], strategy: str,
+                     bound: float = math.inf, deltas: Optional[List[List[float]]] = None) -> Optional[float]:
+    """
+    Returns the cost of the guess whose pattern row is row over all of
+    boards, each a list of candidates, or None if it is certain to be
+    greater than bound.
+    """
+    total = 0
+    for bb, candidates in enumerate(boards):
+        if strategy == 'minimax':
+            cost = guess_cost(row, candidates, strategy, bound - total)
+        else:
+            n = len(candidates)
+            cost = guess_cost(row, candidates, strategy, (bound - total) * n,
+                              deltas[bb] if deltas is not None else None)
+            if cost is not None:
+                cost /= n
+        if cost is None:
+            return None
+        total += cost
+    return total
+# end multi_guess_cost()
+
+
+def multi_block_costs(table, guesses: Sequence[int], boards: List[Sequence[int]], strategy: str):
+    """
+    NumPy version of multi_guess_cost() for a block of guesses at once. The
+    patterns for all the boards are read from table in one go.
+    """
+    union = sorted(set().union(*boards))
+    where = {a: ii for ii, a in enumerate(union)}
+    block = np.asarray(table[np.ix_(guesses, union)], dtype=np.int64)
+    total = np.zeros(len(guesses))
+    for candidates in boards:
+        costs = pattern_costs(block[:, [where[a] for a in candidates]], strategy)
+        total += costs if strategy == 'minimax' else costs / len(candidates)
+    return total
+# end multi_block_costs()
+
+
+def best_multi_in(table, guesses: Sequence[int], boards: List[Sequence[int]],
+                  strategy: str) -> Tuple[tuple, int]:
+    """best_in() for several boards, as scored by multi_guess_cost()."""
+    candidateset = set().union(*boards)
+    best = ((math.inf, 1, len(guesses)), None)
+
+    if np is not None and isinstance(table, np.ndarray):
+        for start in range(0, len(guesses), BLOCK):
+            chunk = guesses[start:start + BLOCK]
+            costs = multi_block_costs(table, chunk, boards, strategy)
+            for ii, cost in enumerate(costs.tolist()):
+                key = (cost, 0 if chunk[ii] in candidateset else 1, start + ii)
+                if key < best[0]:
+                    best = (key, chunk[ii])
+        return best
+
+    deltas = None if strategy == 'minimax' else [bucket_costs(strategy, len(c)) for c in boards]
+    for ii, guess in enumerate(guesses):
+        cost = multi_guess_cost(table[guess], boards, strategy, best[0][0], deltas)
+        if cost is None:
+            continue
+        key = (cost, 0 if guess in candidateset else 1, ii)
+        if key < best[0]:
+            best = (key, guess)
+    return best
+# end best_multi_in()
+
+
+def _best_multi_in_chunk(args):
+    start, guesses, boards, strategy = args
+    (cost, iscandidate, position), guess = best_multi_in(_table, guesses, boards, strategy)
+    return (cost, iscandidate, start + position), guess
+# end _best_multi_in_chunk()
+
+
+def best_multi_guess(table, guesses: Sequence[int], boards: List[Sequence[int]],
+                     strategy: str = 'entropy', pool=None) -> Tuple[int, float]:
+    """
+    Returns (guess, cost) for the guess in guesses that best splits the
+    candidates of all of boards at once, each board a list of indices into
+    table. Leave solved boards out. If pool (from make_pool()) is given,
+    guesses are split across its workers.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f'Unknown strategy: {strategy}')
+    guesses = list(guesses)
+    boards = [list(candidates) for candidates in boards if candidates]
+
+    if pool is None or len(guesses) < 2 * BLOCK:
+        (cost, _, _), guess = best_multi_in(table, guesses, boards, strategy)
+        return guess, cost
+
+    size = max(BLOCK, len(guesses) // 64)
+    tasks = [(start, guesses[start:start + size], boards, strategy)
+             for start in range(0, len(guesses), size)]
+    (cost, _, _), guess = min(pool.imap_unordered(_best_multi_in_chunk, tasks))
+    return guess, cost
+# end best_multi_guess()
+
+
+def entropy(cost: float, n: int) -> float:
+    """Converts an entropy strategy cost for n candidates to bits."""
+    return math.log2(n) - cost / n if n else 0.0
+# end entropy()
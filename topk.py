@@ -0,0 +1,63 @@
+#
+# Bounded selection of the best results, and output in text or JSON lines.
+#
+# TopK keeps the k items with the largest keys seen so far in a min-heap, so
+# choosing the best k of n results takes O(k) memory and O(n log k) time
+# instead of sorting all n. Items with equal keys keep the order they were
+# pushed in, the same as a stable sort, so output doesn't change when -top is
+# given.
+
+import heapq
+import json
+import sys
+
+from typing import Any, Callable, List, Optional
+
+
+class TopK:
+    """The k items with the largest key(item). k of 0 keeps every item."""
+
+    def __init__(self, k: int, key: Callable[[Any], Any]):
+        self.k = k
+        self.key = key
+        self.heap = []
+        self.pushed = 0
+    # end __init__()
+
+    def push(self, item):
+        # -pushed makes the earlier of two equal keys the larger entry, so
+        # it's the later one that is dropped.
+        entry = (self.key(item), -self.pushed, item)
+        self.pushed += 1
+        if self.k <= 0 or len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+    # end push()
+
+    def __len__(self):
+        return len(self.heap)
+
+    def items(self) -> List[Any]:
+        """Returns the items kept, best first."""
+        return [entry[2] for entry in sorted(self.heap, reverse=True)]
+    # end items()
+
+# end class TopK
+
+
+def emit(fmt: str, fields: dict, text: Optional[str] = None, flush: bool = False, out=None):
+    """
+    Writes one result. fmt is 'jsonl' for fields as a JSON object, or
+    'text' for text, which defaults to the field values separated by
+    spaces. When streaming, pass flush so a reader sees it straight away.
+    """
+    if out is None:
+        out = sys.stdout
+    if fmt == 'jsonl':
+        out.write(json.dumps(fields) + '\n')
+    else:
+        out.write((text if text is not None else ' '.join(str(v) for v in fields.values())) + '\n')
+    if flush:
+        out.flush()
+# end emit()
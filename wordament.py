@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 #
 # ./wordament.py pmrepea[en]rihbbslt
+# ./wordament.py 'pmr/lepea[en]ri/ahbbst[-ed]'
+# ./wordament.py -rows 5 -cols 5 abcdefghijklmnopqrstuvwxy
+# ./wordament.py -benchmark -sizes 4 5 6 7 8
+# ./wordament.py -batch boards.txt > results.jsonl
 #
 # TODO:
 #
-# Make it work if there's more than one "special" (e.g. x/y and -xy)
 # Get a better word list.
 # Figure out scoring for real.
 # Do filtering (e.g. star rewards) here rather than on command line.
@@ -12,11 +15,24 @@
 #
 
 import argparse
+import json
 import logging
+import multiprocessing
+import os
+import random
 import re
 import sys
+import time
 
-from typing import Tuple, Dict, List
+from typing import Tuple, Dict, Iterable, Iterator, List
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from topk import TopK, emit
+from wordindex import WordIndex, open_text
 
 VERSION = 0.1
 
@@ -27,6 +43,15 @@ class Global:
     # Command line arguments
     args = None
 
+    # Trie of the words in the unigram file, built on first use.
+    trie = None
+
+    # LetterCounts of the same words for the dfs engine, built on first use.
+    lettercounts = None
+
+    # The filtered words and their counts, shared with -batch workers.
+    word2count = None
+
     letterscores = {
         'a': 2, 'b': 5, 'c': 3, 'd': 3, 'e': 1, 'f': 5, 'g': 4, 'h': 4, 'i': 2,
         'j': 10, 'k': 6, 'l': 3, 'm': 4, 'n': 2, 'o': 2, 'p': 4, 'q': 'unknown', 'r': 2,
@@ -38,30 +63,71 @@ class Global:
 class Wordament:
     # Passed to and set by __init__()
     letters: str
+    rows: int
+    cols: int
 
     # Computed from self.letters in __init__()
-    # Both are 4x4.
+    # Both are cols x rows, indexed [column][row].
     grid: List[List[str]]
     scores: List[List[int]]
 
-    # Mark what positions have been used. Updated while running
-    used: List[List[bool]]
+    # The board compiled by compile() for searching. Cells are numbered in
+    # the order run() tries them, cell = cols*jj + ii for grid[ii][jj], and
+    # a set of cells is an int with bit cell set for each cell in it, so
+    # any size of board fits.
+    # tokens[cell] is the letters the cell can stand for, without any '-'.
+    # That's one string except for a choice tile x/y, which can be any of
+    # its letters. kinds[cell] is PLAIN, PREFIX or SUFFIX and
+    # cellscores[cell] its score.
+    tokens: List[Tuple[str, ...]]
+    kinds: List[int]
+    cellscores: List[int]
+
+    # The neighbors of each cell, in the order neighbors() yields them,
+    # and the same as a bitmask.
+    adjacent: List[Tuple[int, ...]]
+    neighbormasks: List[int]
+
+    # steps[cell] is (neighbor, token) for each token of each neighbor of
+    # cell that can continue a word (so not PREFIX cells), in order.
+    # starts[c] is (cell, token) for the tokens starting with c, in order,
+    # and following[cell][c] is the steps[cell] whose token starts with c.
+    # Searching only these skips the cells that can't match.
+    steps: List[Tuple[Tuple[int, str], ...]]
+    starts: Dict[str, Tuple[Tuple[int, str], ...]]
+    following: List[Dict[str, Tuple[Tuple[int, str], ...]]]
 
     # A word must match this regex for it ever to be considered.
     # This is (probably) a lot faster than searching the grid.
     wordre: re.Pattern
 
-    def __init__(self, letters):
+    # The letters on the board. Checking a word against these is faster
+    # still, and rules out most words before the regex is tried.
+    letterset: frozenset
+
+    # capacity[c] is the most times letter c (26 for anything but a-z)
+    # can appear in a word on the board, counting every letter of every
+    # tile, and every alternative of choice tiles.
+    capacity: List[int]
+
+    # Kinds of cells.
+    PLAIN = 0
+    PREFIX = 1    # xy-, can only start a word
+    SUFFIX = 2    # -xy, can only end a word
+
+    def __init__(self, letters, rows=4, cols=4):
         self.letters = letters
+        self.rows = rows
+        self.cols = cols
 
-        self.grid = [[0]*4 for _ in range(4)]
-        self.scores = [[0]*4 for _ in range(4)]
+        self.grid = [[0]*rows for _ in range(cols)]
+        self.scores = [[0]*rows for _ in range(cols)]
 
         items = set()
         index = 0
-        for jj in range(4):
-            for ii in range(4):
-                # Handle [xy], [xy-], [-xy].
+        for jj in range(rows):
+            for ii in range(cols):
+                # Handle [xy], [xy-], [-xy] and x/y.
                 if letters[index] == '[':
                     endindex = index+1
                     while letters[endindex] != ']':
@@ -77,6 +143,16 @@ class Wordament:
                         self.grid[ii][jj] = item
                         # This score is wrong, but I don't know what it should be.
                         self.scores[ii][jj] = 8
+                elif letters[index+1:index+2] == '/':
+                    # A choice tile can be any of its letters, e.g. x/y or a/e/i.
+                    endindex = index+2
+                    while letters[endindex+1:endindex+2] == '/':
+                        endindex += 2
+                    item = letters[index:endindex+1]
+                    index = endindex
+                    items.update(item.split('/'))
+                    self.grid[ii][jj] = item
+                    self.scores[ii][jj] = 20
                 else:
                     item = letters[index]
                     self.scores[ii][jj] = Global.letterscores[item]
@@ -84,73 +160,176 @@ class Wordament:
                     self.grid[ii][jj] = item
 
                 index += 1
+        if index != len(letters):
+            raise ValueError(f'{letters} has more than {rows}x{cols} tiles')
 
         self.wordre = re.compile(f'({"|".join(items)})+$')
+        self.letterset = frozenset(''.join(items))
 
         # Theory: If all four corners are the same, add 1.
         corner = self.grid[0][0]
-        if self.grid[0][3] == corner and self.grid[3][0] == corner and self.grid[3][3] == corner:
+        right, bottom = cols - 1, rows - 1
+        if self.grid[0][bottom] == corner and self.grid[right][0] == corner and self.grid[right][bottom] == corner:
             self.scores[0][0] += 1
-            self.scores[0][3] += 1
-            self.scores[3][0] += 1
-            self.scores[3][3] += 1
+            self.scores[0][bottom] += 1
+            self.scores[right][0] += 1
+            self.scores[right][bottom] += 1
             logging.info(f'Corner {corner} detected. Using score {self.scores[0][0]}')
 
-        self.used = [[False]*4 for _ in range(4)]
+        self.compile()
     # end __init__()
 
+    def compile(self):
+        """Builds the flat arrays searched by run() and solve() from grid and scores."""
+        self.tokens = []
+        self.kinds = []
+        self.cellscores = []
+        self.adjacent = []
+        self.neighbormasks = []
+        for jj in range(self.rows):
+            for ii in range(self.cols):
+                let = self.grid[ii][jj]
+                if let[0] == '-':
+                    self.tokens.append((let[1:],))
+                    self.kinds.append(Wordament.SUFFIX)
+                elif let[-1] == '-':
+                    self.tokens.append((let[:-1],))
+                    self.kinds.append(Wordament.PREFIX)
+                else:
+                    self.tokens.append(tuple(let.split('/')))
+                    self.kinds.append(Wordament.PLAIN)
+                self.cellscores.append(self.scores[ii][jj])
+                adjacent = tuple(self.cols*y + x for x, y in neighbors((ii, jj), self.rows, self.cols))
+                self.adjacent.append(adjacent)
+                self.neighbormasks.append(sum(1 << cell for cell in adjacent))
+
+        self.starts = {}
+        for cell, tokens in enumerate(self.tokens):
+            for token in tokens:
+                self.starts[token[0]] = self.starts.get(token[0], ()) + ((cell, token),)
+        self.capacity = [0] * 27
+        for tokens in self.tokens:
+            most = {}
+            for token in tokens:
+                for c in set(token):
+                    most[c] = max(most.get(c, 0), token.count(c))
+            for c, count in most.items():
+                self.capacity[letter_index(c)] += count
+
+        self.steps = []
+        self.following = []
+        for adjacent in self.adjacent:
+            steps = tuple((ncell, token) for ncell in adjacent if self.kinds[ncell] != Wordament.PREFIX
+                          for token in self.tokens[ncell])
+            following = {}
+            for step in steps:
+                following[step[1][0]] = following.get(step[1][0], ()) + (step,)
+            self.steps.append(steps)
+            self.following.append(following)
+    # end compile()
+
     def run(self, word: str) -> int:
         """
         Returns the score of a word or zero if the word isn't in the grid or word isn't valid
         according to the provided letters.
         """
-        if not re.match(self.wordre, word):
+        if not self.letterset.issuperset(word) or not self.wordre.match(word):
             return 0
 
-        for jj in range(4):
-            for ii in range(4):
-                let = self.grid[ii][jj]
-                if let[0] == '-':
-                    let = let[1:]
-                    if not word.endswith(let):
-                        continue
-                elif let[-1] == '-':
-                    let = let[:-1]
-                    if not word.startswith(let):
-                        continue
-                self.used = [[False]*4 for _ in range(4)]
-                if word.startswith(let):
-                    found, score = self.found_in_grid(word, len(let), (ii,jj))
-                    if found:
-                        return score + self.scores[ii][jj]
+        for cell, token in self.starts.get(word[0], ()):
+            if self.kinds[cell] == Wordament.SUFFIX:
+                # A suffix tile can only start the word if it's the whole word.
+                if word == token:
+                    return self.cellscores[cell]
+                continue
+            if word.startswith(token):
+                score = self.found_in_grid(word, len(token), cell, 1 << cell)
+                if score >= 0:
+                    return score + self.cellscores[cell]
         return 0
     # end run()
 
-    def found_in_grid(self, word: str, wordindex: int, pos: tuple) -> Tuple[bool, int]:
-        seq = word[wordindex:]
-        #print(f'{seq=} {pos=}\n{self.used}')
-        if self.used[pos[0]][pos[1]]:
-            return False, 0
-        if seq == '':
-            return True, 0
-        self.used[pos[0]][pos[1]] = True
-        #print(f'found_in_grid({seq}, {pos})')
-        for npos in neighbors(pos):
-            nlet = self.grid[npos[0]][npos[1]]    # neighbor letter
-            if nlet[0] == '-':
-                nlet = nlet[1:]
-                if not word.endswith(nlet):
+    def found_in_grid(self, word: str, wordindex: int, cell: int, visited: int) -> int:
+        """
+        Returns the score of the rest of the path spelling word[wordindex:]
+        from the neighbors of cell, not using the cells in visited, or -1 if
+        there is no such path.
+        """
+        if wordindex == len(word):
+            return 0
+        if not self.neighbormasks[cell] & ~visited:
+            return -1
+        for ncell, token in self.following[cell].get(word[wordindex], ()):
+            if visited >> ncell & 1:
+                continue
+            if self.kinds[ncell] == Wordament.SUFFIX:
+                # A suffix tile can only end the word.
+                if wordindex + len(token) == len(word) and word.startswith(token, wordindex):
+                    return self.cellscores[ncell]
+                continue
+            if word.startswith(token, wordindex):
+                score = self.found_in_grid(word, wordindex + len(token), ncell, visited | 1 << ncell)
+                if score >= 0:
+                    return score + self.cellscores[ncell]
+        return -1
+    # end found_in_grid()
+
+    def solve(self, trie: 'Trie') -> Dict[str, int]:
+        """
+        Returns a dict mapping every word in trie that is in the grid to its
+        score. Walks the grid once, abandoning any path that isn't a prefix
+        of a word in trie. Paths are tried in the same order as run(), so
+        each word gets the same score run() gives it.
+        """
+        return dict(self.iter_solve(trie))
+    # end solve()
+
+    def iter_solve(self, trie: 'Trie') -> Iterator[Tuple[str, int]]:
+        """
+        Yields (word, score) for the words solve() returns, each as soon as
+        it's first found.
+        """
+        seen = set()
+        for cell, tokens in enumerate(self.tokens):
+            for token in tokens:
+                node = trie.find(token)
+                if node is None:
                     continue
-            elif nlet[-1] == '-':
-                nlet = nlet[:-1]
-                if not word.startswith(nlet):
+                if self.kinds[cell] == Wordament.SUFFIX:
+                    # A suffix tile can only start the word if it's the whole word.
+                    word = node.get(Trie.END)
+                    if word is not None and word not in seen:
+                        seen.add(word)
+                        yield word, self.cellscores[cell]
                     continue
-            if seq.startswith(nlet):
-                found, score = self.found_in_grid(word, wordindex+len(nlet), npos)
-                if found:
-                    return True, score + self.scores[npos[0]][npos[1]]
-        return False, 0
-    # end found_in_grid()
+                yield from self.walk(node, cell, 1 << cell, self.cellscores[cell], seen)
+    # end iter_solve()
+
+    def walk(self, node: dict, cell: int, visited: int, score: int, seen: set) -> Iterator[Tuple[str, int]]:
+        """
+        Extends the path ending at cell, whose letters led to node in the
+        trie and which uses the cells in visited, yielding (word, score) for
+        the words found that aren't in seen and adding them to it.
+        """
+        word = node.get(Trie.END)
+        if word is not None and word not in seen:
+            seen.add(word)
+            yield word, score
+        for ncell, token in self.steps[cell]:
+            if visited >> ncell & 1:
+                continue
+            child = Trie.descend(node, token)
+            if child is None:
+                continue
+            if self.kinds[ncell] == Wordament.SUFFIX:
+                # A suffix tile can only end the word.
+                word = child.get(Trie.END)
+                if word is not None and word not in seen:
+                    seen.add(word)
+                    yield word, score + self.cellscores[ncell]
+                continue
+            yield from self.walk(child, ncell, visited | 1 << ncell, score + self.cellscores[ncell], seen)
+    # end walk()
 
     def print(self):
         """For debugging"""
@@ -160,65 +339,292 @@ class Wordament:
         print_grid(self.grid)
         print('\nScores')
         print_grid(self.scores)
-        print('\nUsed')
-        print_grid(self.used)
     # end print()
 # end class Wordament
 
 
+class Trie:
+    """
+    A prefix tree of words. Each node is a dict mapping a letter to the
+    child node. A node that ends a word maps END to the word.
+    """
+
+    END = ''
+
+    root: dict
+
+    def __init__(self, words):
+        self.root = {}
+        for word in words:
+            node = self.root
+            for c in word:
+                node = node.setdefault(c, {})
+            node[Trie.END] = word
+    # end __init__()
+
+    def find(self, prefix: str):
+        """Returns the node for prefix, or None if no word starts with it."""
+        return Trie.descend(self.root, prefix)
+    # end find()
+
+    @staticmethod
+    def descend(node: dict, letters: str):
+        """Follows letters down from node. Returns None if there's no path."""
+        for c in letters:
+            node = node.get(c)
+            if node is None:
+                return None
+        return node
+    # end descend()
+
+# end class Trie
+
+
+class LetterCounts:
+    """
+    How many times each letter appears in each of a list of words, for
+    ruling out the words a board doesn't have enough of some letter for
+    without searching the board. With NumPy the counts are an (N, 27)
+    array and all the words are checked at once. Without it each word's
+    counts are packed into an int with one byte per letter, and a word is
+    checked with one subtraction.
+    """
+
+    # Each byte of a packed count has its high bit set here. Subtracting a
+    # word's counts from the capacity, with these bits set, clears the high
+    # bit of the letters the word has too many of.
+    GUARDS = sum(0x80 << 8*c for c in range(27))
+
+    def __init__(self, words: Iterable[str]):
+        self.words = list(words)
+        if np is not None:
+            encoded = [word.encode('utf-8') for word in self.words]
+            blob = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.intp) - ord('a')
+            blob[(blob < 0) | (blob >= 26)] = 26
+            ids = np.repeat(np.arange(len(encoded)), [len(e) for e in encoded])
+            self.counts = np.zeros((len(encoded), 27), dtype=np.uint8)
+            np.add.at(self.counts, (ids, blob), 1)
+        else:
+            self.packed = []
+            for word in self.words:
+                packed = 0
+                for c in word:
+                    packed += 1 << 8*letter_index(c)
+                self.packed.append(packed)
+    # end __init__()
+
+    def fitting(self, capacity: List[int]) -> List[str]:
+        """
+        Returns the words, in order, that don't use any letter c more than
+        capacity[c] times.
+        """
+        if np is not None:
+            fits = (self.counts <= np.minimum(capacity, 255)).all(axis=1)
+            return [self.words[ii] for ii in np.flatnonzero(fits)]
+
+        limit = LetterCounts.GUARDS + sum(min(count, 0x7f) << 8*c for c, count in enumerate(capacity))
+        guards = LetterCounts.GUARDS
+        return [word for word, packed in zip(self.words, self.packed) if (limit - packed) & guards == guards]
+    # end fitting()
+
+# end class LetterCounts
+
+
+def letter_index(c: str) -> int:
+    """Returns 0-25 for a-z and 26 for anything else."""
+    index = ord(c) - ord('a')
+    return index if 0 <= index < 26 else 26
+# end letter_index()
+
+
 def main(argv):
     parse_arguments(argv[1:])
     setup_logging()
 
-    word2count = read_unigrams(Global.args.unigrams, Global.args.mincount)
-
-    word2score = {}
-
-    # For now, handle x/y outside the class by running it twice.
-    # There's a combinatoric explosion if multiple "/" occur, so
-    # only allow one.
-
-    slashindex = Global.args.letters.find('/')
-
-    if slashindex >= 0:
-        # Contains /. Check another '/'.
-        if Global.args.letters.find('/', slashindex+1) != -1:
-            logging.error("Currently, \"/\" can only only appear once")
-            sys.exit(1)
-        let1 = Global.args.letters[slashindex-1]
-        let2 = Global.args.letters[slashindex+1]
-        logging.info(f"Detected {let1}/{let2}")
-        wordament1 = Wordament(Global.args.letters.replace(f'{let1}/{let2}', let1))
-        wordament1.scores[(slashindex-1) % 4][(slashindex-1) // 4] = 20
-        wordament2 = Wordament(Global.args.letters.replace(f'{let1}/{let2}', let2))
-        wordament2.scores[(slashindex-1) % 4][(slashindex-1) // 4] = 20
-        for word, count in word2count.items():
-            score = max(wordament1.run(word), wordament2.run(word))
-            if score:
-                word2score[word] = score
+    if Global.args.index is not None:
+        word2count = read_index(WordIndex(Global.args.index), Global.args.mincount)
     else:
-        # Does not contain x/y
-        wordament = Wordament(Global.args.letters)
+        with open_text(Global.args.unigrams) as f:
+            word2count = read_unigrams(f, Global.args.mincount)
 
-        for word, count in word2count.items():
-            score = wordament.run(word)
-            if score:
-                word2score[word] = score
+    if Global.args.benchmark:
+        benchmark(word2count, Global.args.engine, Global.args.sizes, Global.args.boards, Global.args.seed)
+        return
+
+    if Global.args.batch is not None:
+        run_batch(word2count)
+        return
+
+    try:
+        wordament = read_board(Global.args.letters, Global.args.rows, Global.args.cols)
+    except ValueError as e:
+        logging.error(e)
+        sys.exit(1)
+
+    fmt = Global.args.format
+    if Global.args.stream:
+        for word, score in iter_board(wordament, word2count, Global.args.engine):
+            emit(fmt, {'word': word, 'count': word2count[word], 'score': score}, flush=True)
+        return
+
+    word2score = solve_board(wordament, word2count, Global.args.engine)
 
     # Sort first by score then by how common the word is.
-    sortedwords = sorted(word2score, key=lambda w: (word2score[w], word2count[w]), reverse=True)
+    def key(w):
+        return word2score[w], word2count[w]
 
-    if Global.args.N > 0 and Global.args.n > 0:
+    if Global.args.N > 0 and Global.args.n > 0 and fmt == 'text':
         print(f"\n{Global.args.n}-letter words:\n")
         # Print out N n-letter words
-        for word in [w for w in sortedwords if len(w) == Global.args.n][:Global.args.N]:
+        nletter = TopK(Global.args.N, key)
+        for word in word2score:
+            if len(word) == Global.args.n:
+                nletter.push(word)
+        for word in nletter.items():
             print(word, word2count[word], word2score[word])
 
-    print("\nAll words:\n")
-    for word in sortedwords:
-        print(word, word2count[word], word2score[word])
+    best = TopK(Global.args.top, key)
+    for word in word2score:
+        best.push(word)
+    if fmt == 'text':
+        print("\nAll words:\n")
+    for word in best.items():
+        emit(fmt, {'word': word, 'count': word2count[word], 'score': word2score[word]})
 # end main()
 
+def solve_letters(letters: str, word2count: Dict[str, int], engine: str = 'trie',
+                  rows: int = 4, cols: int = 4) -> Dict[str, int]:
+    """
+    Returns a dict mapping the words in word2count that are in the rows x
+    cols board given by letters to their scores. Raises ValueError if the
+    board can't be solved.
+    """
+    return solve_board(read_board(letters, rows, cols), word2count, engine)
+# end solve_letters()
+
+
+def read_board(letters: str, rows: int = 4, cols: int = 4) -> Wordament:
+    """Returns the rows x cols Wordament for letters. Raises ValueError if it can't be read."""
+    try:
+        return Wordament(letters, rows, cols)
+    except (IndexError, KeyError):
+        raise ValueError(f"Can't read the board {letters}")
+# end read_board()
+
+
+def solve_board(wordament: Wordament, word2count: Dict[str, int], engine: str = 'trie') -> Dict[str, int]:
+    """Returns a dict mapping the words in the board to their scores, using engine."""
+    if engine == 'dfs':
+        return dict(iter_board(wordament, word2count, engine))
+    if Global.trie is None:
+        Global.trie = Trie(word2count)
+    return wordament.solve(Global.trie)
+# end solve_board()
+
+
+def iter_board(wordament: Wordament, word2count: Dict[str, int], engine: str = 'trie') -> Iterator[Tuple[str, int]]:
+    """
+    Yields (word, score) for the words solve_board() returns, each as soon
+    as engine finds it.
+    """
+    if engine == 'dfs':
+        if Global.lettercounts is None:
+            Global.lettercounts = LetterCounts(word2count)
+        for word in Global.lettercounts.fitting(wordament.capacity):
+            score = wordament.run(word)
+            if score:
+                yield word, score
+        return
+
+    if Global.trie is None:
+        Global.trie = Trie(word2count)
+    yield from wordament.iter_solve(Global.trie)
+# end iter_board()
+
+
+def run_batch(word2count: Dict[str, int]):
+    """
+    Solves each board in the -batch file, one per line, printing a JSON
+    line for each as soon as it's solved. The boards are solved in a pool
+    of processes forked after the dictionary is loaded, so they share it.
+    """
+    with open_text(Global.args.batch) as f:
+        boards = [line.strip() for line in f if line.strip()]
+
+    Global.word2count = word2count
+    if Global.args.engine == 'trie' and Global.trie is None:
+        Global.trie = Trie(word2count)
+    if Global.args.engine == 'dfs' and Global.lettercounts is None:
+        Global.lettercounts = LetterCounts(word2count)
+
+    start = time.time()
+    with multiprocessing.get_context('fork').Pool(Global.args.processes) as pool:
+        for result in pool.imap_unordered(solve_batch_board, enumerate(boards)):
+            print(json.dumps(result), flush=True)
+    logging.info(f"Solved {len(boards)} boards in {time.time() - start:.1f}s")
+# end run_batch()
+
+
+def solve_batch_board(item: Tuple[int, str]) -> dict:
+    """
+    Solves one -batch board. item is (index of the board in the file, the
+    board's letters). Words are listed as [word, count, score], best first,
+    at most -top of them.
+    """
+    index, letters = item
+    word2count = Global.word2count
+    start = time.perf_counter()
+    try:
+        word2score = solve_letters(letters, word2count, Global.args.engine, Global.args.rows, Global.args.cols)
+    except ValueError as e:
+        return {'index': index, 'board': letters, 'error': str(e)}
+    except Exception as e:
+        # Any other board that can't be solved, such as one with an unscored
+        # tile, also gets an error line rather than stopping the batch.
+        return {'index': index, 'board': letters, 'error': f'{type(e).__name__}: {e}'}
+    best = TopK(Global.args.top, lambda w: (word2score[w], word2count[w]))
+    for word in word2score:
+        best.push(word)
+    return {'index': index, 'board': letters,
+            'seconds': time.perf_counter() - start,
+            'words': [[w, word2count[w], word2score[w]] for w in best.items()]}
+# end solve_batch_board()
+
+
+def benchmark(word2count: Dict[str, int], engine: str, sizes: List[int], boards: int, seed: int):
+    """
+    Prints how long engine takes to solve random size x size boards, for
+    each size in sizes. Tiles are drawn with the letter frequencies of the
+    words.
+    """
+    lettercounts = {}
+    for word in word2count:
+        for c in word:
+            lettercounts[c] = lettercounts.get(c, 0) + 1
+    # Leave out q, which has no score yet.
+    letters = [c for c in sorted(lettercounts) if isinstance(Global.letterscores.get(c), int)]
+    weights = [lettercounts[c] for c in letters]
+
+    if engine == 'trie' and Global.trie is None:
+        start = time.perf_counter()
+        Global.trie = Trie(word2count)
+        print(f"Built the trie of {len(word2count)} words in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(seed)
+    print(f"{'size':>5} {'cells':>5} {'mean ms':>9} {'max ms':>9} {'words':>7}")
+    for size in sizes:
+        times = []
+        nwords = 0
+        for _ in range(boards):
+            board = ''.join(rng.choices(letters, weights, k=size*size))
+            start = time.perf_counter()
+            nwords += len(solve_letters(board, word2count, engine, size, size))
+            times.append(time.perf_counter() - start)
+        print(f"{size:>3}x{size:<1} {size*size:>5} {1000*sum(times)/boards:>9.1f} {1000*max(times):>9.1f} "
+              f"{nwords/boards:>7.0f}")
+# end benchmark()
+
+
 def read_unigrams(f, mincount):
     word2count = {}
     for line in f:
@@ -240,9 +646,28 @@ def read_unigrams(f, mincount):
 # end read_unigrams()
 
 
-def neighbors(pos: tuple) -> tuple:
+def read_index(index: WordIndex, mincount: int) -> Dict[str, int]:
+    """Same as read_unigrams(), but reads a wordindex.WordIndex."""
+    word2count = {}
+    for n in range(3, index.maxlen + 1):
+        for ii in index.ids_of_length(n):
+            count = index.counts[ii]
+            if count < mincount:
+                continue
+            word = index.word(ii)
+
+            # Skip if three identical letters in a row. This is usually not really a word.
+            if re.search(r'([a-z])\1\1', word):
+                continue
+            word2count[word] = count
+    return word2count
+# end read_index()
+
+
+def neighbors(pos: tuple, rows: int = 4, cols: int = 4) -> tuple:
     """
-    A generator that returns the neighbors of the given tuple.
+    A generator that returns the neighbors of the given tuple on a board
+    with rows rows and cols columns.
     """
     for yinc in (-1, 0, 1):
         y = pos[1] + yinc
@@ -250,7 +675,7 @@ def neighbors(pos: tuple) -> tuple:
             if xinc == 0 and yinc == 0:
                 continue
             x = pos[0] + xinc
-            if 0 <= x < 4 and 0 <= y < 4:
+            if 0 <= x < cols and 0 <= y < rows:
                 yield (x,y)
 # end neighbors
 
@@ -260,8 +685,8 @@ def print_grid(grid, padding=2):
     For debugging.
     """
     width = padding + max([len(str(elem)) for row in grid for elem in row])
-    for jj in range(4):
-        for ii in range(4):
+    for jj in range(len(grid[0])):
+        for ii in range(len(grid)):
             print(f'{grid[ii][jj]:<{width}}', end='')
         print()
 # end print_grid()
@@ -277,7 +702,16 @@ def parse_arguments(strs):
                         help='Logging level')
     parser.add_argument('-version', '--version', action='version', version=str(VERSION))
     parser.add_argument('letters',
-                        help="Letters in wordament")
+                        help="Letters in wordament, row by row",
+                        nargs='?')
+    parser.add_argument('-rows',
+                        help="Rows on the board",
+                        type=int,
+                        default=4)
+    parser.add_argument('-cols',
+                        help="Columns on the board",
+                        type=int,
+                        default=4)
     parser.add_argument('-n',
                         help="First print out n-letter words",
                         type=int,
@@ -287,14 +721,56 @@ def parse_arguments(strs):
                         type=int,
                         default=20)
     parser.add_argument('-unigrams',
-                        help="Unigram count file",
-                        type=argparse.FileType('r'),
+                        help="Unigram count file. May be gzipped",
                         default='RC_2017-09.1gram.counts.cumm.filtered')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -unigrams")
+    parser.add_argument('-engine',
+                        help="trie walks the board once using a trie of the words. dfs searches the "
+                             "board for each word",
+                        choices=['trie', 'dfs'],
+                        default='trie')
     parser.add_argument('-mincount',
                         help="Minimum number of times word must appear",
                         type=int,
                         default=1000)
+    parser.add_argument('-benchmark',
+                        help="Time solving random boards of each of -sizes instead of solving letters",
+                        action='store_true')
+    parser.add_argument('-sizes',
+                        help="Board sizes (size x size) for -benchmark",
+                        type=int,
+                        nargs='+',
+                        default=[4, 5, 6, 7, 8])
+    parser.add_argument('-boards',
+                        help="Random boards per size for -benchmark",
+                        type=int,
+                        default=10)
+    parser.add_argument('-seed',
+                        help="Random seed for -benchmark",
+                        type=int,
+                        default=0)
+    parser.add_argument('-top',
+                        help="Print at most this many words. 0 for all",
+                        type=int,
+                        default=0)
+    parser.add_argument('-stream',
+                        help="Print words in the order they're found, unsorted",
+                        action='store_true')
+    parser.add_argument('-format',
+                        help="text, or jsonl for one JSON object per word",
+                        choices=['text', 'jsonl'],
+                        default='text')
+    parser.add_argument('-batch',
+                        help="File of boards, one per line, to solve instead of letters. Prints a JSON "
+                             "line per board as it's solved. - is stdin")
+    parser.add_argument('-processes',
+                        help="Worker processes for -batch",
+                        type=int,
+                        default=os.cpu_count())
     Global.args = parser.parse_args(strs)
+    if Global.args.letters is None and not Global.args.benchmark and Global.args.batch is None:
+        parser.error("letters are required unless -benchmark or -batch is given")
 # end parse_arguments()
 
 
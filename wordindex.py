@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+#
+# A prebuilt, memory-mappable dictionary index.
+#
+# ./wordindex.py -words words.gz -counts unigram_counts.gz -o words.idx
+# ./wordindex.py -counts RC_2017-09.1gram.counts.cumm.filtered -o rc.idx
+#
+# compiles a word list and/or a counts file ("count word" per line, plain or
+# gzipped) into one binary file. WordIndex memory-maps it, so loading costs a
+# page-in rather than a parse. If -words is given, the index holds those
+# words with their counts from -counts (0 if missing). Otherwise it holds
+# every word in -counts.
+#
+# The file is a header followed by these sections, each 8-byte aligned and
+# in native byte order:
+#
+#   offsets       uint32 x (N+1)  Word i is blob[offsets[i]:offsets[i+1]]
+#   counts        uint64 x N
+#   masks         uint32 x N      Distinct-letter mask, see letter_mask()
+#   bylength      uint32 x N      Word ids ordered by length, then id
+#   lengthstarts  uint32 x (M+2)  Words of length n are
+#                                 bylength[lengthstarts[n]:lengthstarts[n+1]]
+#   bymask        uint32 x N      Word ids ordered by mask, then id
+#   uniquemasks   uint32 x U      The distinct masks, sorted
+#   maskstarts    uint32 x (U+1)  Words whose mask is uniquemasks[k] are
+#                                 bymask[maskstarts[k]:maskstarts[k+1]]
+#   blob          utf-8           The words, sorted, concatenated
+#
+# where N is the number of words, M the length of the longest word and U the
+# number of distinct masks.
+
+import argparse
+import array
+import bisect
+import gzip
+import logging
+import mmap
+import re
+import struct
+import sys
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+VERSION = 0.1
+
+MAGIC = b'WGIX'
+FORMAT_VERSION = 2
+
+# magic, format version, byte order (1 little, 2 big), number of words,
+# length of the longest word, number of distinct masks, blob size in bytes.
+HEADER = struct.Struct('<4sIIIIII')
+
+# Set in a mask for words containing anything other than a-z.
+OTHER = 1 << 26
+
+WORDRE = re.compile(r'[a-z]+$')
+
+
+class Global:
+    """Stores globals. There should be no instances of Global."""
+
+    # Command line arguments
+    args = None
+
+# end class Global
+
+
+def main(argv):
+    parse_arguments(argv[1:])
+    setup_logging()
+
+    if Global.args.words is None and Global.args.counts is None:
+        logging.error("At least one of -words and -counts is required")
+        sys.exit(1)
+
+    word2count = {}
+    if Global.args.counts is not None:
+        with open_text(Global.args.counts) as f:
+            word2count = read_counts(f)
+
+    if Global.args.words is not None:
+        with open_text(Global.args.words) as f:
+            words = {line.strip() for line in f if line.strip()}
+        word2count = {word: word2count.get(word, 0) for word in words}
+
+    compile_index(word2count, Global.args.o)
+    logging.info(f"Wrote {len(word2count)} words to {Global.args.o}")
+# end main()
+
+
+def open_text(path: str):
+    """Opens path for reading text, decompressing if it ends in .gz. '-' is stdin."""
+    if path == '-':
+        return sys.stdin
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path)
+# end open_text()
+
+
+def read_counts(f, length: Optional[int] = None) -> Dict[str, int]:
+    """
+    Reads "count word" lines. Counts for repeated words are added. If length
+    is given, only words of that length are kept.
+    """
+    word2count = {}
+    for line in f:
+        line = line.strip()
+        if line == "":
+            continue
+        count, word = line.split()
+        if length is not None and len(word) != length:
+            continue
+        word2count[word] = word2count.get(word, 0) + int(count)
+    return word2count
+# end read_counts()
+
+
+def letter_mask(word: str) -> int:
+    """Returns the 26-bit mask of the letters in word, plus OTHER for anything else."""
+    mask = 0
+    for c in word:
+        index = ord(c) - ord('a')
+        mask |= 1 << index if 0 <= index < 26 else OTHER
+    return mask
+# end letter_mask()
+
+
+def _align(f):
+    padding = -f.tell() % 8
+    f.write(b'\0' * padding)
+# end _align()
+
+
+def compile_index(word2count: Dict[str, int], path: str):
+    """Writes word2count to path in the format described at the top of this file."""
+    words = sorted(word2count)
+    encoded = [word.encode('utf-8') for word in words]
+    maxlen = max((len(word) for word in words), default=0)
+
+    offsets = array.array('I', [0])
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    counts = array.array('Q', (word2count[word] for word in words))
+    masks = array.array('I', (letter_mask(word) for word in words))
+
+    bylength = array.array('I', sorted(range(len(words)), key=lambda ii: len(words[ii])))
+    lengthstarts = array.array('I', [0] * (maxlen + 2))
+    for word in words:
+        lengthstarts[len(word) + 1] += 1
+    for n in range(1, maxlen + 2):
+        lengthstarts[n] += lengthstarts[n - 1]
+
+    bymask = array.array('I', sorted(range(len(words)), key=lambda ii: masks[ii]))
+    uniquemasks = array.array('I')
+    maskstarts = array.array('I')
+    for position, ii in enumerate(bymask):
+        if not uniquemasks or uniquemasks[-1] != masks[ii]:
+            uniquemasks.append(masks[ii])
+            maskstarts.append(position)
+    maskstarts.append(len(words))
+
+    with open(path, 'wb') as f:
+        byteorder = 1 if sys.byteorder == 'little' else 2
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, byteorder, len(words), maxlen, len(uniquemasks),
+                            offsets[-1]))
+        for section in (offsets, counts, masks, bylength, lengthstarts, bymask, uniquemasks, maskstarts):
+            _align(f)
+            section.tofile(f)
+        _align(f)
+        f.write(b''.join(encoded))
+# end compile_index()
+
+
+class WordIndex:
+    """
+    A memory-mapped index written by compile_index(). Words are identified
+    by their position in sorted order.
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byteorder, nwords, maxlen, nmasks, bloblen = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a word index')
+        if version != FORMAT_VERSION:
+            raise ValueError(f'{path} has format version {version}, expected {FORMAT_VERSION}. Rebuild it.')
+        if byteorder != (1 if sys.byteorder == 'little' else 2):
+            raise ValueError(f'{path} was built on a machine with a different byte order')
+
+        self.maxlen = maxlen
+        view = memoryview(self.mm)
+        position = HEADER.size
+
+        def section(typecode, n):
+            nonlocal position
+            position += -position % 8
+            size = n * struct.calcsize(typecode)
+            result = view[position:position + size].cast(typecode)
+            position += size
+            return result
+
+        self.offsets = section('I', nwords + 1)
+        self.counts = section('Q', nwords)
+        self.masks = section('I', nwords)
+        self.bylength = section('I', nwords)
+        self.lengthstarts = section('I', maxlen + 2)
+        self.bymask = section('I', nwords)
+        self.uniquemasks = section('I', nmasks)
+        self.maskstarts = section('I', nmasks + 1)
+        position += -position % 8
+        self.blob = view[position:position + bloblen]
+    # end __init__()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def word(self, ii: int) -> str:
+        return str(self.blob[self.offsets[ii]:self.offsets[ii + 1]], 'utf-8')
+
+    def count(self, ii: int) -> int:
+        return self.counts[ii]
+
+    def mask(self, ii: int) -> int:
+        return self.masks[ii]
+
+    def __iter__(self) -> Iterator[str]:
+        for ii in range(len(self)):
+            yield self.word(ii)
+    # end __iter__()
+
+    def ids_of_length(self, n: int) -> Iterable[int]:
+        """Returns the ids of the words that are n characters long, in order."""
+        if not 0 <= n <= self.maxlen:
+            return []
+        return self.bylength[self.lengthstarts[n]:self.lengthstarts[n + 1]]
+    # end ids_of_length()
+
+    def ids_with_mask(self, mask: int) -> Iterable[int]:
+        """
+        Returns the ids of the words whose distinct letters are exactly
+        mask (see letter_mask()), in order.
+        """
+        k = bisect.bisect_left(self.uniquemasks, mask)
+        if k == len(self.uniquemasks) or self.uniquemasks[k] != mask:
+            return []
+        return self.bymask[self.maskstarts[k]:self.maskstarts[k + 1]]
+    # end ids_with_mask()
+
+    def letter_ids_of_length(self, n: int) -> Iterator[int]:
+        """
+        Yields the ids of the words that are n characters long and all a-z,
+        in order, leaving out words such as 'bout.
+        """
+        masks = self.masks
+        for ii in self.ids_of_length(n):
+            if not masks[ii] & OTHER:
+                yield ii
+    # end letter_ids_of_length()
+
+    def words_of_length(self, n: int, lettersonly: bool = False) -> Iterator[str]:
+        """Yields the words that are n characters long, only those all a-z if lettersonly."""
+        for ii in self.letter_ids_of_length(n) if lettersonly else self.ids_of_length(n):
+            yield self.word(ii)
+    # end words_of_length()
+
+    def items(self, ids: Optional[Iterable[int]] = None) -> Iterator[Tuple[str, int]]:
+        """Yields (word, count) for ids, or for every word."""
+        if ids is None:
+            ids = range(len(self))
+        for ii in ids:
+            yield self.word(ii), self.counts[ii]
+    # end items()
+
+# end class WordIndex
+
+
+class WordBuckets:
+    """
+    Words and their counts split up by length, for games such as Wordle
+    that only use words of one length. Each length is read the first time
+    it's asked for, from a WordIndex or from a word list and a counts file,
+    and the other lengths are skipped, so only the lengths in use are held
+    in memory. Only words that are all a-z are kept, as with the text word
+    lists the games read.
+
+    words - Word list, one word per line. May be gzipped.
+    counts - Optional counts file of "count word" lines. May be gzipped.
+    index - A WordIndex file, used instead of words and counts.
+    """
+
+    def __init__(self, words: Optional[str] = None, counts: Optional[str] = None,
+                 index: Optional[str] = None):
+        self.wordspath = words
+        self.countspath = counts
+        self.index = WordIndex(index) if index is not None else None
+        self.buckets = {}
+    # end __init__()
+
+    def words(self, length: int) -> List[str]:
+        """Returns the words that are length letters long, sorted."""
+        return self._bucket(length)[0]
+    # end words()
+
+    def counts(self, length: int) -> Dict[str, int]:
+        """Returns the counts of the words that are length letters long."""
+        return self._bucket(length)[1]
+    # end counts()
+
+    def _bucket(self, length: int) -> Tuple[List[str], Dict[str, int]]:
+        bucket = self.buckets.get(length)
+        if bucket is not None:
+            return bucket
+
+        if self.index is not None:
+            counts = dict(self.index.items(self.index.letter_ids_of_length(length)))
+            words = sorted(counts)
+        else:
+            with open_text(self.wordspath) as f:
+                words = sorted({word for word in (line.strip() for line in f)
+                                if len(word) == length and WORDRE.match(word)})
+            counts = {}
+            if self.countspath is not None:
+                with open_text(self.countspath) as f:
+                    counts = {word: count for word, count in read_counts(f, length).items()
+                              if WORDRE.match(word)}
+        logging.info(f"Loaded {len(words)} words of length {length}")
+        bucket = self.buckets[length] = (words, counts)
+        return bucket
+    # end _bucket()
+
+# end class WordBuckets
+
+
+def parse_arguments(strs):
+    parser = argparse.ArgumentParser(
+        description=f"Compiles a word list and/or counts file into a word index. Version {VERSION}.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-loglevel',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+                        default='INFO',
+                        help='Logging level')
+    parser.add_argument('-version', '--version', action='version', version=str(VERSION))
+    parser.add_argument('-words',
+                        help="Word list, one word per line. May be gzipped")
+    parser.add_argument('-counts',
+                        help="Counts file with \"count word\" lines. May be gzipped")
+    parser.add_argument('-o',
+                        help="Index file to write",
+                        required=True)
+    Global.args = parser.parse_args(strs)
+# end parse_arguments()
+
+
+def setup_logging():
+    numeric_level = getattr(logging, Global.args.loglevel, None)
+    if not isinstance(numeric_level, int):
+        raise ValueError(f'Invalid log level: {Global.args.loglevel}')
+    logging.basicConfig(level=numeric_level,
+                        format="%(module)s:%(levelname)s:%(asctime)s: %(message)s",
+                        datefmt='%Y-%m-%d %H:%M:%S')
+# end setup_logging()
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,10 +1,43 @@
 #!/usr/bin/env python3
 #
+# A Wordle simulator.
+#
+# With -batch, plays solve2.py's Solver against every word (or a -sample of
+# them) for each of -strategies, spreading the games across a process pool,
+# and prints a JSON report of guess counts, failures and per-round latency:
+#
+# ./wordle.py -batch -sample 500 -strategies letters entropy
+#
+# With -absurdle, the host is adversarial, as in Absurdle: it doesn't pick
+# an answer, but after each guess splits the words still possible by the
+# reply they'd give and keeps the largest group. Each split is one pass of
+# bincount over the guess's row of the pattern table. -absurdle -batch plays
+# each of -strategies against that host instead, as a worst-case test.
 
 import argparse
+import collections
+import json
 import logging
+import multiprocessing
+import os
 import random
 import sys
+import time
+
+import patterns
+import solve2
+import strategy
+
+from typing import List, Sequence, Tuple
+
+from patterns import all_green, feedback, pattern_reply
+from wordindex import WordBuckets
+from wordmatrix import make_table
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 VERSION = 0.1
 
@@ -15,6 +48,14 @@ class Global:
     # Command line arguments
     args = None
 
+    # The argument parser, for reporting bad arguments found after loading
+    # the words.
+    parser = None
+
+    # (table, unigrams, strategy, patterntable, first guess) for the game
+    # being played by -batch. Set before the pool is forked.
+    game = None
+
 # end class Global
 
 
@@ -22,9 +63,25 @@ def main(argv):
     parse_arguments(argv[1:])
     setup_logging()
 
-    words = read_words(Global.args.wordfile)
-    word = random.sample(words, 1)[0]
-    word = 'prime'
+    # Only the solvers played by -batch need the unigram counts.
+    unigrams = Global.args.unigrams if Global.args.batch else None
+    buckets = WordBuckets(Global.args.wordfile, unigrams, Global.args.index)
+    words = buckets.words(Global.args.length)
+    if Global.args.first and Global.args.first not in words:
+        Global.parser.error(f"-first {Global.args.first} is not a {Global.args.length}-letter word in the word list")
+
+    if Global.args.absurdle:
+        if Global.args.batch:
+            print(json.dumps(run_absurdle_batch(words, buckets.counts(Global.args.length)), indent=2))
+        else:
+            play_absurdle(words)
+        return
+
+    if Global.args.batch:
+        print(json.dumps(run_batch(words, buckets.counts(Global.args.length)), indent=2))
+        return
+
+    word = random.choice(words)
 
     print(f'"{word}"')
 
@@ -34,24 +91,228 @@ def main(argv):
         if guess == word:
             print("Correct!")
             break
-        for ii in range(len(guess)):
-            if guess[ii] == word[ii]:
-                sys.stdout.write(f"\033[92m{guess[ii]}\033[0m ")
-            elif guess[ii] in word:
-                sys.stdout.write(f"\033[33m{guess[ii]}\033[0m ")
-            else:
-                sys.stdout.write(f"{guess[ii]} ")
-        print()
+        if len(guess) != len(word):
+            print(f"The guess must be exactly {len(word)} letters.")
+            continue
+        show_reply(guess, pattern_reply(feedback(guess, word), len(word)))
 # end main()
 
 
-def read_words(f):
-    words = set()
-    for line in f:
-        line = line.strip()
-        words.add(line)
-    return words
-# end read_words()
+def show_reply(guess: str, reply: str):
+    """Prints guess colored by reply."""
+    for ii in range(len(guess)):
+        if reply[ii] == 'g':
+            sys.stdout.write(f"\033[92m{guess[ii]}\033[0m ")
+        elif reply[ii] == 'y':
+            sys.stdout.write(f"\033[33m{guess[ii]}\033[0m ")
+        else:
+            sys.stdout.write(f"{guess[ii]} ")
+    print()
+# end show_reply()
+
+
+def absurdle_reply(patterntable, guess: int, survivors: Sequence[int]) -> Tuple[int, List[int]]:
+    """
+    Returns (the reply pattern, the survivors that give it) for the largest
+    group of survivors when guess is split by reply. guess and survivors are
+    indices into patterntable. Ties go to the lowest pattern.
+    """
+    if np is not None and isinstance(patterntable, np.ndarray):
+        survivors = np.asarray(survivors, dtype=np.intp)
+        row = patterntable[guess][survivors]
+        pattern = int(np.bincount(row).argmax())
+        return pattern, survivors[row == pattern].tolist()
+
+    row = patterntable[guess]
+    buckets = {}
+    for ai in survivors:
+        buckets.setdefault(row[ai], []).append(ai)
+    pattern = min(buckets, key=lambda p: (-len(buckets[p]), p))
+    return pattern, buckets[pattern]
+# end absurdle_reply()
+
+
+def play_absurdle(words: List[str]):
+    """Hosts an interactive game of Absurdle."""
+    patterntable = patterns.load_table(words, Global.args.cachedir)
+    wordids = {word: ii for ii, word in enumerate(words)}
+    length = Global.args.length
+    survivors = list(range(len(words)))
+
+    guessi = 1
+    while True:
+        sys.stdout.write(f"Guess {guessi}: ")
+        guess = input().strip().lower()
+        if guess not in wordids:
+            print(f"{guess} isn't a {length} letter word in the list.")
+            continue
+        pattern, survivors = absurdle_reply(patterntable, wordids[guess], survivors)
+        show_reply(guess, pattern_reply(pattern, length))
+        if pattern == all_green(length):
+            print(f"Correct in {guessi} guesses!")
+            break
+        logging.info(f"{len(survivors)} words left")
+        guessi += 1
+# end play_absurdle()
+
+
+def run_batch(words, unigrams):
+    """
+    Plays solve2.Solver against the answers, from words, for each strategy
+    in -strategies and returns a report for each.
+    """
+    answers = words
+    if Global.args.sample > 0:
+        answers = random.Random(Global.args.seed).sample(words, min(Global.args.sample, len(words)))
+
+    table = make_table(words)
+
+    report = {'words': len(words), 'answers': len(answers), 'strategies': {}}
+    for name in Global.args.strategies:
+        patterntable = None
+        if name != 'letters':
+            patterntable = patterns.load_table(table.words, Global.args.cachedir)
+
+        first = Global.args.first
+        if first is None:
+            first = 'aeros' if Global.args.length == 5 else ''
+        if first == '':
+            first = solve2.Solver(table, unigrams, name, patterntable).next_guess()
+
+        Global.game = (table, unigrams, name, patterntable, first)
+        start = time.time()
+        with multiprocessing.get_context('fork').Pool(Global.args.processes) as pool:
+            results = list(pool.imap_unordered(play_game, answers, chunksize=8))
+        elapsed = time.time() - start
+
+        report['strategies'][name] = summarize(results, elapsed)
+        report['strategies'][name]['first'] = first
+        logging.info(f"{name}: {report['strategies'][name]['mean_guesses']:.3f} guesses, {elapsed:.1f}s")
+    return report
+# end run_batch()
+
+
+def play_game(answer):
+    """
+    Plays one game against answer. Returns (answer, number of guesses or
+    None if not solved within -maxguesses, seconds taken to choose each
+    guess after the first).
+    """
+    table, unigrams, name, patterntable, first = Global.game
+    solver = solve2.Solver(table, unigrams, name, patterntable, None, Global.args.hardmode)
+
+    guess = first
+    latencies = []
+    for nguesses in range(1, Global.args.maxguesses + 1):
+        if guess == answer:
+            return answer, nguesses, latencies
+        solver.update(guess, pattern_reply(feedback(guess, answer), len(answer)))
+
+        start = time.perf_counter()
+        if len(solver.survivors) == 1:
+            guess = solver.words[0]
+        else:
+            guess = solver.next_guess()
+            if guess is None:
+                guess = solver.words[0]
+        latencies.append(time.perf_counter() - start)
+    return answer, None, latencies
+# end play_game()
+
+
+def run_absurdle_batch(words, unigrams):
+    """
+    Plays solve2.Solver against the adversarial host for each strategy in
+    -strategies and returns a report for each.
+    """
+    table = make_table(words)
+    hosttable = patterns.load_table(table.words, Global.args.cachedir)
+
+    report = {'words': len(words), 'strategies': {}}
+    for name in Global.args.strategies:
+        patterntable = None if name == 'letters' else hosttable
+        first = Global.args.first
+        if first is None:
+            first = 'aeros' if Global.args.length == 5 else ''
+        if first == '':
+            first = solve2.Solver(table, unigrams, name, patterntable).next_guess()
+
+        solver = solve2.Solver(table, unigrams, name, patterntable, None, Global.args.hardmode)
+        start = time.time()
+        guesses, won, latencies = play_against_absurdle(solver, hosttable, first)
+        elapsed = time.time() - start
+
+        nguesses = len(guesses) if won and len(guesses) <= Global.args.maxguesses else None
+        report['strategies'][name] = summarize([(guesses[-1], nguesses, latencies)], elapsed)
+        report['strategies'][name]['guesses'] = guesses
+        logging.info(f"{name}: {len(guesses)} guesses, {elapsed:.1f}s")
+    return report
+# end run_absurdle_batch()
+
+
+def play_against_absurdle(solver, hosttable, first: str, maxguesses: int = 100):
+    """
+    Plays solver against the adversarial host, giving up after maxguesses.
+    Returns (the guesses made, whether the last one was all green, the
+    seconds taken to choose each guess after the first).
+    """
+    words = solver.table.words
+    wordids = {word: ii for ii, word in enumerate(words)}
+    length = solver.length
+    survivors = list(range(len(words)))
+
+    guess = first
+    guesses = []
+    latencies = []
+    while len(guesses) < maxguesses:
+        guesses.append(guess)
+        pattern, survivors = absurdle_reply(hosttable, wordids[guess], survivors)
+        if pattern == all_green(length):
+            return guesses, True, latencies
+        solver.update(guess, pattern_reply(pattern, length))
+
+        start = time.perf_counter()
+        if len(solver.survivors) == 1:
+            guess = solver.words[0]
+        else:
+            guess = solver.next_guess()
+            if guess is None:
+                guess = solver.words[0]
+        latencies.append(time.perf_counter() - start)
+    return guesses, False, latencies
+# end play_against_absurdle()
+
+
+def summarize(results, elapsed):
+    """Turns the results of play_game() into a report."""
+    histogram = collections.Counter()
+    failures = []
+    latencies = []
+    for answer, nguesses, gamelatencies in results:
+        latencies.extend(gamelatencies)
+        if nguesses is None:
+            failures.append(answer)
+        else:
+            histogram[nguesses] += 1
+
+    solved = sum(histogram.values())
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return 0.0
+        return 1000 * latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))]
+
+    return {
+        'games': len(results),
+        'histogram': {str(n): histogram[n] for n in sorted(histogram)},
+        'mean_guesses': sum(n * count for n, count in histogram.items()) / solved if solved else None,
+        'failure_rate': len(failures) / len(results) if results else 0.0,
+        'failures': sorted(failures),
+        'latency_ms': {f'p{p}': percentile(p) for p in (50, 90, 99, 100)},
+        'elapsed_seconds': elapsed,
+    }
+# end summarize()
 
 
 def parse_arguments(strs):
@@ -63,8 +324,54 @@ def parse_arguments(strs):
                         default='WARNING',
                         help='Logging level')
     parser.add_argument('-version', '--version', action='version', version=str(VERSION))
-    parser.add_argument('-wordfile', help='Word file', type=argparse.FileType('r'), default='words')
+    parser.add_argument('-wordfile', help='Word file. May be gzipped', default='words')
+    parser.add_argument('-index',
+                        help="Word index built by wordindex.py. Used instead of -wordfile and -unigrams")
+    parser.add_argument('-length',
+                        help="Word length",
+                        type=int,
+                        default=5)
+    parser.add_argument('-batch',
+                        help="Play the solver against every word and print a JSON report",
+                        action='store_true')
+    parser.add_argument('-absurdle',
+                        help="Host adversarially: keep the largest group of words consistent with the replies",
+                        action='store_true')
+    parser.add_argument('-strategies',
+                        help="Solver strategies to run with -batch",
+                        nargs='+',
+                        choices=['letters'] + list(strategy.STRATEGIES),
+                        default=['letters'] + list(strategy.STRATEGIES))
+    parser.add_argument('-sample',
+                        help="With -batch, only play this many randomly chosen answers. 0 for all",
+                        type=int,
+                        default=0)
+    parser.add_argument('-seed',
+                        help="Random seed for -sample",
+                        type=int,
+                        default=0)
+    parser.add_argument('-maxguesses',
+                        help="With -batch, a game not solved in this many guesses is a failure",
+                        type=int,
+                        default=6)
+    parser.add_argument('-first',
+                        help="First guess for -batch. Defaults to aeros for 5 letters. If empty, a "
+                             "pattern-based strategy computes it")
+    parser.add_argument('-hardmode',
+                        help="With -batch and a pattern-based strategy, only guess candidates",
+                        action='store_true')
+    parser.add_argument('-unigrams',
+                        help="Unigram count file for -batch. May be gzipped",
+                        default='unigram_counts')
+    parser.add_argument('-processes',
+                        help="Worker processes for -batch",
+                        type=int,
+                        default=os.cpu_count())
+    parser.add_argument('-cachedir',
+                        help="Directory for cached pattern tables",
+                        default=patterns.DEFAULT_CACHEDIR)
     Global.args = parser.parse_args(strs)
+    Global.parser = parser
 # end parse_arguments()
 
 
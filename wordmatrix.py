@@ -0,0 +1,143 @@
+#
+# NumPy version of constraints.WordTable.
+#
+# The word list is held as an (N, L) matrix of letter bits, 1 << letter, and
+# an N vector of the bits of every letter in each word, so a set of
+# constraints is applied to every word with a handful of array operations
+# instead of a Python loop: a word matches if each of its letter bits is in
+# the allowed mask for its position and its letter mask includes the
+# required letters. select_many() does the same for many constraint sets,
+# such as the boards of a multi-board game, in one call.
+#
+# NumPy is optional. make_table() returns a WordMatrix when NumPy is
+# installed and a constraints.WordTable otherwise; both have the same
+# select()/filter() interface.
+
+import logging
+
+from typing import Iterable, List, Optional
+
+from constraints import Constraints, WordTable, is_word
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class WordMatrix:
+    """
+    A fixed list of equal-length words as NumPy arrays.
+
+    letters - (N, L) uint8. letters[i, j] is the j'th letter of word i, 0-25.
+    bits - (N, L) uint32. bits[i, j] is 1 << letters[i, j].
+    wordmasks - (N,) uint32. The OR of bits[i], the letters in word i.
+    """
+
+    words: List[str]
+
+    def __init__(self, words: Iterable[str]):
+        if np is None:
+            raise ImportError('WordMatrix requires numpy')
+        # Words that aren't all a-z can't be candidates, so they're left out,
+        # as in WordTable.
+        self.words = [word for word in words if is_word(word)]
+        self.length = len(self.words[0]) if self.words else 0
+        if any(len(word) != self.length for word in self.words):
+            raise ValueError('WordMatrix requires words of equal length')
+
+        blob = np.frombuffer(''.join(self.words).encode('ascii'), dtype=np.uint8)
+        self.letters = (blob.reshape(len(self.words), self.length) - ord('a')).astype(np.uint8)
+        if self.letters.size and self.letters.max() >= 26:
+            raise ValueError('WordMatrix requires lowercase words')
+
+        self.bits = np.left_shift(np.uint32(1), self.letters, dtype=np.uint32)
+        self.wordmasks = np.bitwise_or.reduce(self.bits, axis=1)
+    # end __init__()
+
+    def __len__(self):
+        return len(self.words)
+
+    def mask(self, constraints: Constraints, indices=None):
+        """
+        Returns a boolean array that is True for the words that match
+        constraints. If indices is given, the array is for those words only.
+        """
+        bits = self.bits if indices is None else self.bits[indices]
+        wordmasks = self.wordmasks if indices is None else self.wordmasks[indices]
+
+        if constraints.length != self.length:
+            return np.zeros(len(bits), dtype=bool)
+
+        allowed = np.array(constraints.allowed, dtype=np.uint32)
+        required = np.uint32(constraints.required)
+        return ((bits & allowed) != 0).all(axis=1) & ((wordmasks & required) == required)
+    # end mask()
+
+    def select(self, constraints: Constraints, indices: Optional[Iterable[int]] = None) -> List[int]:
+        """Same as WordTable.select()."""
+        if indices is None:
+            return np.flatnonzero(self.mask(constraints)).tolist()
+        indices = np.asarray(list(indices), dtype=np.intp)
+        return indices[self.mask(constraints, indices)].tolist()
+    # end select()
+
+    def filter(self, constraints: Constraints, indices: Optional[Iterable[int]] = None) -> List[str]:
+        """Same as WordTable.filter()."""
+        return [self.words[ii] for ii in self.select(constraints, indices)]
+    # end filter()
+
+    def select_many(self, constraints_list: List[Constraints],
+                    indices_list: Optional[List[Iterable[int]]] = None) -> List[List[int]]:
+        """
+        Same as WordTable.select_many(). The words to check for every
+        constraint set are stacked into one array and checked together.
+        """
+        if indices_list is None:
+            indices_list = [None] * len(constraints_list)
+        results = [[] for _ in constraints_list]
+        batch = [gg for gg, c in enumerate(constraints_list) if c.length == self.length]
+        if not batch:
+            return results
+
+        chunks = [np.arange(len(self.words)) if indices_list[gg] is None
+                  else np.asarray(list(indices_list[gg]), dtype=np.intp) for gg in batch]
+        indices = np.concatenate(chunks)
+        # game[k] is the position in batch of the constraints for indices[k].
+        game = np.repeat(np.arange(len(batch)), [len(chunk) for chunk in chunks])
+
+        allowed = np.array([constraints_list[gg].allowed for gg in batch], dtype=np.uint32)
+        required = np.array([constraints_list[gg].required for gg in batch], dtype=np.uint32)[game]
+        ok = ((self.bits[indices] & allowed[game]) != 0).all(axis=1) & \
+            ((self.wordmasks[indices] & required) == required)
+
+        bounds = np.cumsum([len(chunk) for chunk in chunks])[:-1]
+        for gg, keep in zip(batch, np.split(indices[ok], np.searchsorted(np.flatnonzero(ok), bounds))):
+            results[gg] = keep.tolist()
+        return results
+    # end select_many()
+
+# end class WordMatrix
+
+
+def make_table(words: Iterable[str], backend: str = 'auto'):
+    """
+    Returns a WordMatrix for words if NumPy is available (or backend is
+    'numpy'), otherwise a constraints.WordTable. backend is 'auto', 'numpy'
+    or 'python'.
+    """
+    words = list(words)
+    if backend == 'python':
+        return WordTable(words)
+    if np is None:
+        if backend == 'numpy':
+            raise ImportError('The numpy backend requires numpy')
+        return WordTable(words)
+    try:
+        return WordMatrix(words)
+    except ValueError as e:
+        if backend == 'numpy':
+            raise
+        logging.info(f'Using the python backend: {e}')
+        return WordTable(words)
+# end make_table()